@@ -1,10 +1,23 @@
 import streamlit as st
 import streamlit.components.v1 as components
-import pandas as pd
-import requests
-import urllib.parse
 import base64
+import cProfile
+import hmac
+import io
 import json
+import os
+import zlib
+import functools
+import pstats
+import time
+import tracemalloc
+from finance_core import auth, metrics, render
+from finance_core.estimator import estimate
+from finance_core.formatting import fmt_abs
+from finance_core.sheets import Source
+
+_rerun_t0 = time.perf_counter()
+_spans    = metrics.start_trace()
 
 # ── Page config ───────────────────────────────────────────────────────────────
 st.set_page_config(
@@ -17,498 +30,131 @@ st.set_page_config(
 # ── Constants ─────────────────────────────────────────────────────────────────
 CLIENT_ID      = st.secrets["CLIENT_ID"]
 CLIENT_SECRET  = st.secrets["CLIENT_SECRET"]
-SPREADSHEET_ID = st.secrets["SPREADSHEET_ID"]
-SHEET_NAME     = st.secrets["SHEET_NAME"]
+SPREADSHEET_ID = st.secrets.get("SPREADSHEET_ID")
+SHEET_NAME     = st.secrets.get("SHEET_NAME")
 REDIRECT_URI   = "https://henrysfinanceapp.streamlit.app/"
-SCOPES         = "https://www.googleapis.com/auth/spreadsheets.readonly"
-AUTH_URL       = "https://accounts.google.com/o/oauth2/v2/auth"
-TOKEN_URL      = "https://oauth2.googleapis.com/token"
+SCOPES         = "openid https://www.googleapis.com/auth/spreadsheets.readonly"
 MN_TAX_RATE    = float(st.secrets["TAX_RATE"])
 HOURLY_RATE    = float(st.secrets["HOURLY_RATE"])
 STORAGE_KEY    = "pf_token_v1"
-
-# ── CSS ───────────────────────────────────────────────────────────────────────
-st.markdown("""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=DM+Serif+Display:ital@0;1&family=DM+Sans:opsz,wght@9..40,300;9..40,400;9..40,500;9..40,600&display=swap');
-
-*, *::before, *::after { box-sizing: border-box; }
-html, body, [class*="css"] {
-    font-family: 'DM Sans', -apple-system, sans-serif;
-    -webkit-font-smoothing: antialiased;
-}
-
-/* ── Black everywhere ── */
-.stApp, .stApp > div,
-section[data-testid="stMain"],
-section[data-testid="stMain"] > div,
-.block-container,
-div[data-testid="stVerticalBlock"] {
-    background: #080808 !important;
-}
-
-/* ── Number input: hide label, large clean text ── */
-div[data-testid="stNumberInput"] label { display: none !important; }
-div[data-testid="stNumberInput"] > div > div {
-    background: #0d0d0d !important;
-    border: 1px solid #1e1e1e !important;
-    border-radius: 14px !important;
-}
-div[data-testid="stNumberInput"] input {
-    color: #e8e8e8 !important;
-    font-family: 'DM Serif Display', Georgia, serif !important;
-    font-size: 28px !important;
-    letter-spacing: -0.5px !important;
-    text-align: right !important;
-    padding-right: 14px !important;
-}
-div[data-testid="stNumberInput"] button {
-    color: #404040 !important;
-    background: transparent !important;
-    border: none !important;
-}
-div[data-testid="stNumberInput"] > div > div:focus-within {
-    border-color: #333 !important;
-    box-shadow: 0 0 0 3px rgba(255,255,255,0.025) !important;
-}
-
-/* ── Text input (search) ── */
-div[data-baseweb="input"] > div {
-    background: #0d0d0d !important;
-    border: 1px solid #1e1e1e !important;
-    border-radius: 12px !important;
-}
-div[data-baseweb="input"] > div:focus-within {
-    border-color: #333 !important;
-}
-div[data-baseweb="input"] input {
-    color: #d8d8d8 !important;
-    font-family: 'DM Sans', sans-serif !important;
-    font-size: 14px !important;
-}
-div[data-baseweb="input"] input::placeholder { color: #303030 !important; }
-
-/* ── Regular buttons ── */
-button[kind="secondary"] {
-    background: #0d0d0d !important;
-    color: #c0c0c0 !important;
-    border: 1px solid #1e1e1e !important;
-    border-radius: 12px !important;
-    font-family: 'DM Sans', sans-serif !important;
-    font-weight: 500 !important;
-    font-size: 14px !important;
-}
-button[kind="secondary"]:hover {
-    background: #141414 !important;
-    border-color: #282828 !important;
-}
-
-/* ── Sign-in link button ── */
-a[data-testid="stLinkButton"] button {
-    background: #f0f0f0 !important;
-    color: #080808 !important;
-    border: none !important;
-    border-radius: 14px !important;
-    font-family: 'DM Sans', sans-serif !important;
-    font-weight: 600 !important;
-    font-size: 15px !important;
-}
-
-/* ── Misc ── */
-hr { border-color: #161616 !important; }
-#MainMenu, footer, header { visibility: hidden; }
-div[data-testid="stDecoration"] { display: none; }
-.stSpinner > div { border-top-color: #fff !important; }
-
-/* ═══════════════ CUSTOM COMPONENTS ═══════════════ */
-
-.wordmark {
-    font-family: 'DM Sans', sans-serif;
-    font-size: 10px; font-weight: 600;
-    letter-spacing: 3.5px; text-transform: uppercase;
-    color: #2a2a2a; margin-bottom: 8px;
-}
-.page-title {
-    font-family: 'DM Serif Display', Georgia, serif;
-    font-size: 40px; color: #efefef;
-    letter-spacing: -0.6px; line-height: 1;
-    margin: 0 0 28px;
-}
-
-/* Hero balance */
-.hero-balance {
-    background: #0d0d0d;
-    border: 1px solid #1a1a1a;
-    border-radius: 24px;
-    padding: 28px 24px 22px;
-    margin-bottom: 22px;
-    position: relative; overflow: hidden;
-}
-.hero-balance::after {
-    content: '';
-    position: absolute; top: 0; left: 10%; right: 10%;
-    height: 1px;
-    background: linear-gradient(90deg, transparent, #222, transparent);
-}
-.hero-label {
-    font-size: 10px; font-weight: 600;
-    letter-spacing: 1.8px; text-transform: uppercase;
-    color: #383838; margin-bottom: 10px;
-}
-.hero-amount {
-    font-family: 'DM Serif Display', Georgia, serif;
-    font-size: 56px; letter-spacing: -1.5px;
-    line-height: 1; margin-bottom: 8px;
-}
-.hero-sub { font-size: 12px; color: #2e2e2e; letter-spacing: 0.3px; }
-
-.spend-color  { color: #ff453a; }
-.save-color   { color: #30d158; }
-.give-color   { color: #0a84ff; }
-.pos-color    { color: #30d158; }
-.neg-color    { color: #ff453a; }
-.neutral-color { color: #d0d0d0; }
-
-.section-label {
-    font-size: 9px; font-weight: 600;
-    letter-spacing: 2px; text-transform: uppercase;
-    color: #383838; margin: 28px 0 12px;
-}
-
-/* Estimator */
-.est-row {
-    display: flex; align-items: center;
-    justify-content: space-between;
-    padding: 6px 0 4px;
-}
-.est-label {
-    font-size: 13px; font-weight: 500;
-    color: #505050; letter-spacing: 0.3px;
-}
-
-.breakdown-rows {
-    background: #060606;
-    border: 1px solid #161616;
-    border-radius: 16px; overflow: hidden;
-    margin-top: 8px;
-}
-.brow {
-    display: flex; justify-content: space-between; align-items: center;
-    padding: 11px 18px; border-bottom: 1px solid #101010;
-    font-size: 13px; color: #484848;
-}
-.brow:last-child { border-bottom: none; }
-.bval {
-    font-family: 'DM Serif Display', Georgia, serif;
-    font-size: 18px; color: #aaa; letter-spacing: -0.2px;
-}
-.brow.total-row { padding: 14px 18px; border-top: 1px solid #1a1a1a; }
-.brow.total-row .blab {
-    font-size: 9px; font-weight: 600;
-    letter-spacing: 1.8px; text-transform: uppercase; color: #383838;
-}
-.brow.total-row .bval { font-size: 26px; color: #c8c8c8; letter-spacing: -0.5px; }
-
-.verdict {
-    border-radius: 16px; padding: 20px 18px;
-    margin-top: 12px; text-align: center;
-}
-.verdict.yes { background: rgba(48,209,88,0.07); border: 1px solid rgba(48,209,88,0.13); }
-.verdict.no  { background: rgba(255,69,58,0.07); border: 1px solid rgba(255,69,58,0.13); }
-.v-eye {
-    font-size: 9px; font-weight: 600;
-    letter-spacing: 2px; text-transform: uppercase; margin-bottom: 8px;
-}
-.verdict.yes .v-eye { color: #30d158; }
-.verdict.no  .v-eye { color: #ff453a; }
-.v-num {
-    font-family: 'DM Serif Display', Georgia, serif;
-    font-size: 38px; letter-spacing: -1px; line-height: 1; margin-bottom: 8px;
-}
-.verdict.yes .v-num { color: #30d158; }
-.verdict.no  .v-num { color: #ff453a; }
-.v-desc { font-size: 13px; color: #484848; margin-bottom: 14px; }
-.work-badge {
-    display: inline-flex; align-items: center; gap: 5px;
-    background: #0d0d0d; border: 1px solid #1e1e1e;
-    border-radius: 20px; padding: 7px 14px;
-    font-size: 12px; color: #585858;
-}
-.work-badge strong { color: #a0a0a0; }
-
-/* Ledger */
-.ledger {
-    background: #0d0d0d; border: 1px solid #1a1a1a;
-    border-radius: 20px; overflow: hidden; margin-bottom: 22px;
-}
-.ledger-row {
-    display: flex; align-items: center;
-    padding: 13px 18px; border-bottom: 1px solid #101010;
-    gap: 13px; transition: background 0.1s;
-}
-.ledger-row:last-child { border-bottom: none; }
-.ledger-row:hover { background: #101010; }
-.l-icon {
-    width: 36px; height: 36px; border-radius: 10px;
-    display: flex; align-items: center; justify-content: center;
-    font-size: 15px; flex-shrink: 0;
-}
-.li-pos  { background: rgba(48,209,88,0.09); }
-.li-neg  { background: rgba(255,69,58,0.09); }
-.li-mix  { background: rgba(255,255,255,0.04); }
-.l-info  { flex: 1; min-width: 0; }
-.l-name  { font-size: 14px; font-weight: 500; color: #d8d8d8;
-           white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
-.l-type  { font-size: 11px; color: #383838; margin-top: 2px; letter-spacing: 0.5px; }
-.l-amt   { font-family: 'DM Serif Display', Georgia, serif;
-           font-size: 17px; letter-spacing: -0.2px; flex-shrink: 0; }
-
-/* Sign-in */
-.signin-outer {
-    min-height: 88vh; display: flex; flex-direction: column;
-    align-items: center; justify-content: center;
-    text-align: center; padding: 40px 24px;
-}
-.signin-wordmark {
-    font-size: 10px; font-weight: 600; letter-spacing: 4px;
-    text-transform: uppercase; color: #222; margin-bottom: 52px;
-}
-.signin-glyph { font-size: 48px; color: #222; margin-bottom: 32px; }
-.signin-h {
-    font-family: 'DM Serif Display', Georgia, serif;
-    font-size: 48px; color: #efefef; letter-spacing: -1px;
-    line-height: 1.05; margin-bottom: 14px;
-}
-.signin-p { font-size: 15px; color: #404040; line-height: 1.65; margin-bottom: 48px; }
-
-.empty-state { text-align: center; padding: 40px 20px;
-               font-size: 13px; color: #282828; letter-spacing: 0.3px; }
-.footer-text { text-align: center; font-size: 10px; color: #1e1e1e;
-               letter-spacing: 1.5px; text-transform: uppercase;
-               margin-top: 24px; padding-bottom: 24px; }
-
-/* ── Native pill card buttons ── */
-div[data-testid="stHorizontalBlock"] div[data-testid="stButton"] > button {
-    background: #0d0d0d !important;
-    border: 1px solid #1a1a1a !important;
-    border-radius: 18px !important;
-    padding: 14px 10px 12px !important;
-    height: auto !important;
-    min-height: 78px !important;
-    display: flex !important;
-    flex-direction: column !important;
-    align-items: center !important;
-    justify-content: center !important;
-    line-height: 1.3 !important;
-    white-space: pre-line !important;
-    font-family: 'DM Sans', sans-serif !important;
-    font-size: 9px !important;
-    font-weight: 600 !important;
-    letter-spacing: 1.4px !important;
-    color: #505050 !important;
-    transition: background 0.15s, border-color 0.15s !important;
-}
-div[data-testid="stHorizontalBlock"] div[data-testid="stButton"] > button:hover {
-    background: #111 !important;
-    border-color: #252525 !important;
-    color: #606060 !important;
-}
-.pill-active-spend div[data-testid="stButton"] > button {
-    background: #150a0a !important;
-    border-color: rgba(255,69,58,0.25) !important;
-    color: #ff453a !important;
-}
-.pill-active-save div[data-testid="stButton"] > button {
-    background: #0a1510 !important;
-    border-color: rgba(48,209,88,0.25) !important;
-    color: #30d158 !important;
-}
-.pill-active-give div[data-testid="stButton"] > button {
-    background: #080d18 !important;
-    border-color: rgba(10,132,255,0.25) !important;
-    color: #0a84ff !important;
-}
-</style>
-""", unsafe_allow_html=True)
-
-
-# ── JS: clear-on-focus + block scroll-on-enter ────────────────────────────────
-BEHAVIOR_JS = """
-<script>
-(function() {
-    function setup() {
-        var doc = window.parent.document;
-        // Block Enter from scrolling page on number inputs
-        if (!doc._hf_enter_bound) {
-            doc._hf_enter_bound = true;
-            doc.addEventListener('keydown', function(e) {
-                if (e.key === 'Enter') {
-                    var el = doc.activeElement;
-                    if (el && el.type === 'number') {
-                        e.preventDefault();
-                        e.stopImmediatePropagation();
-                        el.blur();
-                    }
-                }
-            }, true);
-        }
-        // Clear-on-focus for number inputs showing 0
-        doc.querySelectorAll('input[type="number"]').forEach(function(inp) {
-            if (!inp._hf_focus) {
-                inp._hf_focus = true;
-                inp.addEventListener('focus', function() {
-                    if (parseFloat(this.value) === 0 || this.value === '0.00') {
-                        this.value = '';
-                        this.dispatchEvent(new Event('input', {bubbles: true}));
-                    }
-                });
-                inp.addEventListener('blur', function() {
-                    if (this.value === '' || this.value === null) {
-                        this.value = '0.00';
-                        this.dispatchEvent(new Event('input', {bubbles: true}));
-                    }
-                });
-            }
-        });
-    }
-    setup();
-    setTimeout(setup, 600);
-    setTimeout(setup, 1400);
-})();
-</script>
-"""
+CACHE_TTL      = float(st.secrets.get("CACHE_TTL", 60))
+POLL_MIN       = float(st.secrets.get("POLL_MIN_INTERVAL", 10))
+CACHE_ENTRIES  = int(st.secrets.get("CACHE_MAX_ENTRIES", 32))
+CACHE_MB       = float(st.secrets.get("CACHE_MAX_MB", 64))
+SNAPSHOT_DIR   = st.secrets.get("SNAPSHOT_DIR", ".snapshots")
+OFFLINE        = bool(st.secrets.get("OFFLINE", False))
+PAGE_ROWS      = int(st.secrets.get("LEDGER_PAGE_ROWS", 50))
+CHART_POINTS   = int(st.secrets.get("CHART_POINTS", 400))
+DEBUG_KEY      = st.secrets.get("DEBUG_KEY")
+SOURCES        = [Source(s["spreadsheet_id"], s["sheet"], s.get("label", s["sheet"]))
+                  for s in st.secrets.get("SOURCES", [])] or \
+                 [Source(SPREADSHEET_ID, SHEET_NAME, SHEET_NAME)]
+
+# ── Diagnostics switch ────────────────────────────────────────────────────────
+# ?debug=<DEBUG_KEY> adds a diagnostics panel under the footer; &profile=1 also
+# captures cProfile and tracemalloc for that one run. Without the secret the
+# panel does not exist.
+DEBUG   = bool(DEBUG_KEY) and hmac.compare_digest(st.query_params.get("debug", "").encode(),
+                                                    DEBUG_KEY.encode())
+PROFILE = DEBUG and st.query_params.get("profile") == "1"
+_stale  = st.session_state.pop("_profiler", None)
+if _stale is not None:          # a profiled run that stopped early
+    _stale.disable()
+    tracemalloc.stop()
+if PROFILE:
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    st.session_state["_profiler"] = profiler
+    profiler.enable()
+
+# ── Markdown payload ──────────────────────────────────────────────────────────
+# Every HTML block goes out through md() so each run (and each fragment run)
+# can report how many bytes of markup it pushed to the browser.
+_payload = {"bytes": 0}
+
+def md(body):
+    _payload["bytes"] += len(body.encode())
+    st.markdown(body, unsafe_allow_html=True)
+
+
+# ── CSS & behavior JS ─────────────────────────────────────────────────────────
+# components/page_assets/ holds the stylesheet and the input behavior script.
+# The component installs both into the page once and the browser caches the
+# files, so reruns only resend a version string. The very first run of a
+# session also inlines the CSS so the first paint is already styled.
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), "components", "page_assets")
+page_assets = components.declare_component("page_assets", path=ASSETS_DIR)
+
+@st.cache_resource
+def assets():
+    with open(os.path.join(ASSETS_DIR, "style.css"), encoding="utf-8") as f:
+        css = f.read()
+    with open(os.path.join(ASSETS_DIR, "behavior.js"), "rb") as f:
+        version = f"{zlib.crc32(css.encode(), zlib.crc32(f.read())):08x}"
+    return css, version
+
+css, ASSETS_VERSION = assets()
+page_assets(version=ASSETS_VERSION, key="page_assets", default=None)
+if not st.session_state.get("_css_sent"):
+    st.session_state["_css_sent"] = True
+    md(f"<style>\n{css}</style>")
 
 
 # ── Persistent login helpers ──────────────────────────────────────────────────
+# A small bidirectional component owns the token in localStorage. "load"
+# answers with whatever is stored (or null), which reruns the script with the
+# session in hand: no redirect, no second page load or websocket.
+session_store = components.declare_component(
+    "session_store", path=os.path.join(os.path.dirname(__file__), "components", "session_store"))
+
 def save_token_js(token_info):
     encoded = base64.b64encode(json.dumps(token_info).encode()).decode()
-    components.html(f"""
-    <script>
-        try {{ localStorage.setItem('{STORAGE_KEY}', '{encoded}'); }} catch(e) {{}}
-    </script>""", height=0)
-
-def inject_restore_js():
-    components.html(f"""
-    <script>
-    (function() {{
-        var s = null;
-        try {{ s = localStorage.getItem('{STORAGE_KEY}'); }} catch(e) {{}}
-        if (!s) return;
-        var url = new URL(window.parent.location.href);
-        if (url.searchParams.has('code') || url.searchParams.has('_rt')) return;
-        url.searchParams.set('_rt', s);
-        window.parent.location.replace(url.toString());
-    }})();
-    </script>""", height=0)
+    session_store(action="save", name=STORAGE_KEY, value=encoded, key="token_save")
+
+def load_token_js():
+    return session_store(action="load", name=STORAGE_KEY, key="token_load", default=None)
 
 def clear_token_js():
-    components.html(f"""
-    <script>
-        try {{ localStorage.removeItem('{STORAGE_KEY}'); }} catch(e) {{}}
-    </script>""", height=0)
-
-
-# ── Helpers ───────────────────────────────────────────────────────────────────
-def fmt(v):
-    if v == 0: return "$0.00"
-    sign = "+" if v > 0 else "−"
-    return f"{sign}${abs(v):,.2f}"
-
-def fmt_abs(v):
-    return f"${abs(v):,.2f}"
-
-def fmt_hours(h):
-    if h < 1:    return f"{max(1,int(h*60))} min"
-    elif h < 8:
-        hh, m = int(h), int((h%1)*60)
-        return f"{hh}h {m}m" if m else f"{hh}h"
-    else:        return f"{h/8:.1f} work days"
-
-def tx_icon(v):
-    if v > 0: return "↑", "li-pos"
-    if v < 0: return "↓", "li-neg"
-    return "·", "li-mix"
-
-def tx_type(v):
-    if v > 0: return "Credit"
-    if v < 0: return "Debit"
-    return "—"
-
-def color_cls(v):
-    if v > 0: return "pos-color"
-    if v < 0: return "neg-color"
-    return "neutral-color"
-
-
-# ── OAuth ─────────────────────────────────────────────────────────────────────
-def get_auth_url():
-    return AUTH_URL + "?" + urllib.parse.urlencode({
-        "client_id": CLIENT_ID, "redirect_uri": REDIRECT_URI,
-        "response_type": "code", "scope": SCOPES,
-        "access_type": "offline", "prompt": "consent",
-    })
-
-def exchange_code(code):
-    return requests.post(TOKEN_URL, data={
-        "code": code, "client_id": CLIENT_ID,
-        "client_secret": CLIENT_SECRET, "redirect_uri": REDIRECT_URI,
-        "grant_type": "authorization_code",
-    }).json()
+    session_store(action="clear", name=STORAGE_KEY, key="token_clear")
 
 
 # ── Data ──────────────────────────────────────────────────────────────────────
-@st.cache_data(ttl=60)
-def fetch_data(access_token):
-    h = {"Authorization": f"Bearer {access_token}"}
-    def f(v):
-        try: return float(str(v).replace(",","").replace("$",""))
-        except: return 0.0
-
-    tot = requests.get(
-        f"https://sheets.googleapis.com/v4/spreadsheets/{SPREADSHEET_ID}"
-        f"/values/{urllib.parse.quote(SHEET_NAME+'!I5:K5')}", headers=h
-    ).json()
-    row = tot.get("values",[[0,0,0]])[0]
-    s1 = f(row[0]) if len(row)>0 else 0.0
-    s2 = f(row[1]) if len(row)>1 else 0.0
-    s3 = f(row[2]) if len(row)>2 else 0.0
-
-    txr = requests.get(
-        f"https://sheets.googleapis.com/v4/spreadsheets/{SPREADSHEET_ID}"
-        f"/values/{urllib.parse.quote(SHEET_NAME+'!A3:D999')}", headers=h
-    ).json()
-    records = []
-    for r in txr.get("values",[]):
-        name = r[0] if r else ""
-        if not name: continue
-        records.append({"name":name,
-            "spending": f(r[1]) if len(r)>1 and r[1] else 0.0,
-            "savings":  f(r[2]) if len(r)>2 and r[2] else 0.0,
-            "giving":   f(r[3]) if len(r)>3 and r[3] else 0.0,
-        })
-    df = pd.DataFrame(records) if records else pd.DataFrame(
-        columns=["name","spending","savings","giving"])
-    return df.iloc[::-1].reset_index(drop=True), s1, s2, s3
+# The ledger service (and with it pandas, numpy and pyarrow) is imported on
+# first use, so the sign-in screen of a cold process starts without them.
+@st.cache_resource
+def ledger_service(sources, snapshot_dir, ttl, max_entries, max_bytes, window_rows, fetch_workers,
+                   poll_min, probe):
+    from finance_core.service import LedgerService
+    return LedgerService(sources, snapshot_dir, ttl, max_entries, max_bytes,
+                         window_rows=window_rows, fetch_workers=fetch_workers, poll_min=poll_min,
+                         probe=probe)
+
+def service():
+    return ledger_service(tuple(SOURCES), SNAPSHOT_DIR, CACHE_TTL, CACHE_ENTRIES,
+                          int(CACHE_MB * (1 << 20)), st.secrets.get("WINDOW_ROWS"),
+                          st.secrets.get("FETCH_WORKERS"), POLL_MIN, st.secrets.get("PROBE"))
+
+def forget_token():
+    st.session_state.pop("token_info", None)
+    st.session_state.pop("_saved_gen", None)
+    st.session_state["_no_restore"] = True     # the stored answer is stale now
+    st.session_state["_clear_storage"] = True
+    tokens = st.session_state.pop("tokens", None)
+    if tokens is not None: tokens.close()
 
 
 # ── Auth flow & Routing ───────────────────────────────────────────────────────
 qp = st.query_params
 
-# 1. Restore from localStorage redirect
-if "_rt" in qp and "token_info" not in st.session_state:
-    try:
-        ti = json.loads(base64.b64decode(qp["_rt"]).decode())
-        if "access_token" in ti:
-            st.session_state["token_info"] = ti
-    except Exception:
-        pass
-    if "_rt" in st.query_params: del st.query_params["_rt"]
-    st.rerun()
+# Signing out clears the stored token on the run after it: an element emitted
+# just before st.rerun() may never reach the browser.
+if st.session_state.pop("_clear_storage", False):
+    clear_token_js()
 
-# 2. Handle OAuth callback
+# 1. Handle OAuth callback
 if "code" in qp and "token_info" not in st.session_state:
     with st.spinner("Authenticating…"):
-        ti = exchange_code(qp["code"])
+        ti = auth.exchange_code(qp["code"], CLIENT_ID, CLIENT_SECRET, REDIRECT_URI)
     if "access_token" in ti:
         st.session_state["token_info"] = ti
         st.session_state["_save_token"] = True
@@ -518,10 +164,25 @@ if "code" in qp and "token_info" not in st.session_state:
         st.error("Authentication failed.")
         st.json(ti)
     
+# 2. Restore from localStorage. Until the browser answers there is nothing to
+#    show; a returning user goes straight on to their data on the next run.
+if not OFFLINE and "token_info" not in st.session_state and "code" not in qp \
+        and not st.session_state.get("_no_restore"):
+    stored = load_token_js()
+    if stored is None:
+        st.stop()
+    st.session_state["_no_restore"] = True
+    try:
+        ti = json.loads(base64.b64decode(stored["token"]).decode()) if stored["token"] else {}
+        if "access_token" in ti:
+            st.session_state["token_info"] = ti
+            st.session_state["_restored_at"] = (time.perf_counter(), stored["restore_ms"])
+    except Exception:
+        pass
+
 # ── Sign-in screen ────────────────────────────────────────────────────────────
-if "token_info" not in st.session_state:
-    inject_restore_js()
-    st.markdown("""
+if not OFFLINE and "token_info" not in st.session_state:
+    md("""
     <style>
     /* Remove Streamlit's default top padding on the sign-in screen */
     .block-container { padding-top: 0 !important; }
@@ -530,142 +191,179 @@ if "token_info" not in st.session_state:
         <div class="signin-glyph">◈</div>
         <div class="signin-h">Your money,<br>clearly.</div>
         <div class="signin-p">Secure access to your spending,<br>savings &amp; giving accounts.</div>
-    </div>""", unsafe_allow_html=True)
+    </div>""")
     c1, c2, c3 = st.columns([1,2,1])
     with c2:
-        st.link_button("Sign in with Google", get_auth_url(), use_container_width=True)
+        st.link_button("Sign in with Google", auth.auth_url(CLIENT_ID, REDIRECT_URI, SCOPES),
+                       use_container_width=True)
     st.stop()
 
-# Persist token to localStorage after fresh OAuth
-if st.session_state.pop("_save_token", False):
-    save_token_js(st.session_state["token_info"])
+# One token manager per session renews the access token before it lapses.
+if not OFFLINE and "tokens" not in st.session_state:
+    st.session_state["tokens"] = auth.TokenManager(st.session_state["token_info"],
+                                                   CLIENT_ID, CLIENT_SECRET)
+tokens = None if OFFLINE else st.session_state["tokens"]
 
 # ── Load data ─────────────────────────────────────────────────────────────────
+pending = None
 try:
-    df, spending_total, savings_total, giving_total = fetch_data(
-        st.session_state["token_info"]["access_token"])
+    with metrics.timer("fetch"):
+        if OFFLINE:
+            state = service().offline()
+        else:
+            state, pending = tokens.call(service().fetch)
 except Exception as e:
     st.error(f"Unable to retrieve account data: {e}")
-    clear_token_js()
+    if OFFLINE: st.stop()
+    # Only a rejected refresh token means signing in again; keep it otherwise.
+    if isinstance(e, auth.AuthError): clear_token_js()
     if st.button("Sign Out"):
-        del st.session_state["token_info"]
+        forget_token()
         st.rerun()
     st.stop()
-
-spend_df = df[df["spending"] != 0].reset_index(drop=True)
-save_df  = df[df["savings"]  != 0].reset_index(drop=True)
-give_df  = df[df["giving"]   != 0].reset_index(drop=True)
+user  = None if OFFLINE else auth.identity(tokens.access_token())
+
+# Persist the token after a fresh OAuth or a silent renewal, so a reload
+# restores a live token (and its refresh token) without a consent round trip.
+if tokens is not None and (st.session_state.pop("_save_token", False)
+                           or st.session_state.get("_saved_gen", 0) != tokens.generation):
+    st.session_state["token_info"] = tokens.info
+    st.session_state["_saved_gen"] = tokens.generation
+    save_token_js(tokens.info)
+
+import pandas as pd     # already loaded along with the ledger; chart and diagnostics frames
+with metrics.timer("model"):
+    model = state.model()
+
+# Time to first data for a restored session: browser-side time from page load
+# until the stored token reached us, plus the server time from there to here.
+if "_restored_at" in st.session_state:
+    t, browser_ms = st.session_state.pop("_restored_at")
+    metrics.observe("session.ttfd", browser_ms + (time.perf_counter() - t) * 1000)
+spending_total = model.total("spending")
+savings_total  = model.total("savings")
+giving_total   = model.total("giving")
 
 # Default view
 if "active_view" not in st.session_state:
     st.session_state["active_view"] = "spending"
-view = st.session_state["active_view"]
-
-# ── Inject behavior JS ────────────────────────────────────────────────────────
-st.markdown(BEHAVIOR_JS, unsafe_allow_html=True)
 
 # ── Header ────────────────────────────────────────────────────────────────────
 col_h, col_btn = st.columns([5,1])
 with col_h:
-    st.markdown("""
+    md("""
     <div style='padding:28px 0 0'>
         <div class='wordmark'>Personal Finance</div>
         <div class='page-title'>Overview</div>
-    </div>""", unsafe_allow_html=True)
+    </div>""")
 with col_btn:
-    st.markdown("<div style='margin-top:42px'></div>", unsafe_allow_html=True)
-    if st.button("Sign Out", use_container_width=True):
-        clear_token_js()
-        del st.session_state["token_info"]
-        st.cache_data.clear()
+    md("<div style='margin-top:42px'></div>")
+    if not OFFLINE and st.button("Sign Out", use_container_width=True):
+        service().forget(user)
+        forget_token()
         st.rerun()
 
-# ── Clickable pill cards (native st.button — instant, zero-reload) ────────────
-pill_col1, pill_col2, pill_col3 = st.columns(3)
+# ── Helper: memoized fragments ────────────────────────────────────────────────
+# Finished HTML and chart frames keyed on (user, data version, view, …), so
+# flipping between views or back to an earlier search is a lookup. A new data
+# version drops that user's fragments.
+@st.cache_resource
+def fragment_cache():
+    return render.FragmentCache(max_entries=256, max_bytes=16 << 20)
 
-with pill_col1:
-    if view == "spending":
-        st.markdown('<div class="pill-active-spend">', unsafe_allow_html=True)
-    if st.button(
-        f"DISCRETIONARY\n{fmt_abs(spending_total)}",
-        key="pill_spend", use_container_width=True
-    ):
-        st.session_state["active_view"] = "spending"
-        st.rerun()
-    if view == "spending":
-        st.markdown('</div>', unsafe_allow_html=True)
-
-with pill_col2:
-    if view == "savings":
-        st.markdown('<div class="pill-active-save">', unsafe_allow_html=True)
-    if st.button(
-        f"RESERVES\n{fmt_abs(savings_total)}",
-        key="pill_save", use_container_width=True
-    ):
-        st.session_state["active_view"] = "savings"
-        st.rerun()
-    if view == "savings":
-        st.markdown('</div>', unsafe_allow_html=True)
-
-with pill_col3:
-    if view == "giving":
-        st.markdown('<div class="pill-active-give">', unsafe_allow_html=True)
-    if st.button(
-        f"CHARITABLE\n{fmt_abs(giving_total)}",
-        key="pill_give", use_container_width=True
-    ):
-        st.session_state["active_view"] = "giving"
-        st.rerun()
-    if view == "giving":
-        st.markdown('</div>', unsafe_allow_html=True)
-
-st.markdown("<div style='height:4px'></div>", unsafe_allow_html=True)
+def cached(*key, build):
+    def timed():
+        with metrics.timer(f"build.{key[0]}"):
+            return build()
+    return fragment_cache().get(user, state.version, key, timed)
 
 
 # ── Helper: render ledger rows ────────────────────────────────────────────────
-def render_ledger(data, col):
-    if data.empty:
-        st.markdown('<div class="empty-state">No transactions on record.</div>', unsafe_allow_html=True)
+# Only the visible page of rows is turned into HTML and sent to the browser.
+def set_page(key, page):
+    st.session_state[f"{key}_page"] = page
+
+def ledger_page(idx, col, page):
+    window = idx[page * PAGE_ROWS:(page + 1) * PAGE_ROWS]
+    return render.ledger_html(
+        model.names_at(window), model.cents[col][window],
+        model.sources_at(window) if len(SOURCES) > 1 else None)
+
+def render_ledger(col, query, key):
+    idx = cached("rows", col, query, build=lambda: model.search(col, query))
+    if not len(idx):
+        md('<div class="empty-state">No transactions on record.</div>')
         return
-    html = ""
-    for _, r in data.iterrows():
-        v = r[col]
-        icon, icls = tx_icon(v)
-        html += f"""
-        <div class="ledger-row">
-            <div class="l-icon {icls}">{icon}</div>
-            <div class="l-info">
-                <div class="l-name">{r['name']}</div>
-                <div class="l-type">{tx_type(v)}</div>
-            </div>
-            <div class="l-amt {color_cls(v)}">{fmt(v)}</div>
-        </div>"""
-    st.markdown(f'<div class="ledger">{html}</div>', unsafe_allow_html=True)
-
-
-# ╔═════════════════════════════════════════════════════════════════════════════
-# ║  SPENDING VIEW
-# ╚═════════════════════════════════════════════════════════════════════════════
-if view == "spending":
-
-    st.markdown(f"""
-    <div class="hero-balance">
-        <div class="hero-label">Discretionary Balance</div>
-        <div class="hero-amount spend-color">{fmt_abs(spending_total)}</div>
-        <div class="hero-sub">Available to spend · Synced from ledger</div>
-    </div>""", unsafe_allow_html=True)
-
-    # ── Purchase Estimator ────────────────────────────────────────────────────
-    st.markdown('<div class="section-label">Purchase Estimator</div>', unsafe_allow_html=True)
+    pages = -(-len(idx) // PAGE_ROWS)
+    page  = min(st.session_state.get(f"{key}_page", 0), pages - 1)
+    lo, hi = page * PAGE_ROWS, min(len(idx), (page + 1) * PAGE_ROWS)
+    md(cached("ledger", col, query, page, build=lambda: ledger_page(idx, col, page)))
+    if pages > 1:
+        c1, c2, c3 = st.columns([1,2,1])
+        with c1:
+            st.button("‹  Newer", key=f"{key}_newer", disabled=page == 0,
+                      on_click=set_page, args=(key, page - 1), use_container_width=True)
+        with c2:
+            md(f'<div class="pager">{lo+1:,}–{hi:,} of {len(idx):,}</div>')
+        with c3:
+            st.button("Older  ›", key=f"{key}_older", disabled=page == pages - 1,
+                      on_click=set_page, args=(key, page + 1), use_container_width=True)
+
+# Balance history downsampled to CHART_POINTS unless full resolution is asked for.
+def render_history(col, label, color):
+    full = False
+    if len(model.view(col)) > CHART_POINTS:
+        full = st.toggle("Full resolution", key=f"full_{col}")
+    def build():
+        x, y = model.history_points(col, None if full else CHART_POINTS)
+        return pd.DataFrame({label: y}, index=x)
+    st.line_chart(cached("chart", col, full, build=build), color=[color])
+
+# ── Helper: hero card, with a flag when the sheet total disagrees ─────────────
+def hero_html(col, label, color, sub, total, cell):
+    return render.hero_html(label, color, sub, total, mismatches.get(col), cell)
+
+# ── Helper: purchase estimator breakdown ──────────────────────────────────────
+def estimate_html(price_input):
+    est = estimate(price_input, spending_total, MN_TAX_RATE, HOURLY_RATE)
+    return render.estimate_html(est, MN_TAX_RATE, HOURLY_RATE)
+
+mismatches = model.mismatches()
+
+
+# ── Fragments ─────────────────────────────────────────────────────────────────
+# Interactions rerun only the fragment they happen in: typing a price reruns
+# the estimator, searching or paging reruns that ledger panel, and a pill click
+# reruns the switcher (pills + active view). CSS, header and data loading only
+# run on a full rerun. Each fragment run is timed into finance_core.metrics.
+def fragment(name):
+    def wrap(fn):
+        @st.fragment
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            start = _payload["bytes"]
+            with metrics.timer(f"rerun.{name}"):
+                fn(*args, **kwargs)
+            metrics.gauge(f"payload.{name}.bytes", _payload["bytes"] - start)
+        return run
+    return wrap
+
+def set_view(view):
+    st.session_state["active_view"] = view
+
+
+@fragment("estimator")
+def estimator():
+    md('<div class="section-label">Purchase Estimator</div>')
 
     est_col, price_col = st.columns([2, 3])
     with est_col:
-        st.markdown("""
+        md("""
         <div style='display:flex;align-items:center;height:68px'>
             <span style='font-size:14px;color:#484848;letter-spacing:0.3px;font-weight:500'>
                 Purchase Estimator
             </span>
-        </div>""", unsafe_allow_html=True)
+        </div>""")
     with price_col:
         price_input = st.number_input(
             "price", min_value=0.0, value=0.0, step=0.01, format="%.2f",
@@ -673,124 +371,175 @@ if view == "spending":
         )
 
     if price_input > 0:
-        tax_amt    = price_input * MN_TAX_RATE
-        total_cost = price_input + tax_amt
-        after      = spending_total - total_cost
-        can_afford = after >= 0
-        hrs_total  = total_cost / HOURLY_RATE
-
-        st.markdown(f"""
-        <div class="breakdown-rows">
-            <div class="brow">
-                <span>Sticker price</span>
-                <span class="bval">{fmt_abs(price_input)}</span>
-            </div>
-            <div class="brow">
-                <span>Sales tax <small style='color:#282828'>7.375%</small></span>
-                <span class="bval">+ {fmt_abs(tax_amt)}</span>
-            </div>
-            <div class="brow total-row">
-                <span class="blab">Total cost</span>
-                <span class="bval">{fmt_abs(total_cost)}</span>
-            </div>
-        </div>""", unsafe_allow_html=True)
-
-        if can_afford:
-            st.markdown(f"""
-            <div class="verdict yes">
-                <div class="v-eye">Remaining balance</div>
-                <div class="v-num">{fmt_abs(after)}</div>
-                <div class="v-desc">You can afford this purchase</div>
-                <div class="work-badge">⏱&nbsp; costs <strong>{fmt_hours(hrs_total)}</strong> of work @ ${HOURLY_RATE:.0f}/hr</div>
-            </div>""", unsafe_allow_html=True)
-        else:
-            shortfall  = abs(after)
-            hrs_needed = shortfall / HOURLY_RATE
-            st.markdown(f"""
-            <div class="verdict no">
-                <div class="v-eye">Shortfall</div>
-                <div class="v-num">{fmt_abs(shortfall)}</div>
-                <div class="v-desc">You need {fmt_abs(shortfall)} more to afford this</div>
-                <div class="work-badge">⏱&nbsp; need <strong>{fmt_hours(hrs_needed)}</strong> more work @ ${HOURLY_RATE:.0f}/hr</div>
-            </div>
-            <p style='text-align:center;font-size:11px;color:#242424;margin-top:10px;letter-spacing:0.3px'>
-                Full cost = <strong style='color:#323232'>{fmt_hours(hrs_total)}</strong> of work
-            </p>""", unsafe_allow_html=True)
-
-    # ── Transaction Ledger ────────────────────────────────────────────────────
-    st.markdown('<div class="section-label">Transaction Ledger</div>', unsafe_allow_html=True)
-    srch = st.text_input("Search", placeholder="🔍  Search transactions…",
-                          label_visibility="collapsed", key="srch_spend")
-    disp = spend_df[spend_df["name"].str.contains(srch, case=False, na=False)] \
-           if srch else spend_df
-    render_ledger(disp, "spending")
-
-    if not spend_df.empty:
-        st.markdown('<div class="section-label">Balance History</div>', unsafe_allow_html=True)
-        chron = spend_df.iloc[::-1].reset_index(drop=True)
-        st.line_chart(pd.DataFrame({"Discretionary": chron["spending"].cumsum()}),
-                      color=["#ff453a"])
-
-
-# ╔═════════════════════════════════════════════════════════════════════════════
-# ║  SAVINGS VIEW
-# ╚═════════════════════════════════════════════════════════════════════════════
-elif view == "savings":
-
-    st.markdown(f"""
-    <div class="hero-balance">
-        <div class="hero-label">Reserve Balance</div>
-        <div class="hero-amount save-color">{fmt_abs(savings_total)}</div>
-        <div class="hero-sub">Long-term reserves · Growing steadily</div>
-    </div>""", unsafe_allow_html=True)
-
-    st.markdown('<div class="section-label">Deposit Ledger</div>', unsafe_allow_html=True)
-    srch_sv = st.text_input("Search", placeholder="🔍  Search deposits…",
-                             label_visibility="collapsed", key="srch_save")
-    disp_sv = save_df[save_df["name"].str.contains(srch_sv, case=False, na=False)] \
-              if srch_sv else save_df
-    render_ledger(disp_sv, "savings")
-
-    if not save_df.empty:
-        st.markdown('<div class="section-label">Reserve Growth</div>', unsafe_allow_html=True)
-        chron_sv = save_df.iloc[::-1].reset_index(drop=True)
-        st.line_chart(pd.DataFrame({"Reserves": chron_sv["savings"].cumsum()}),
-                      color=["#30d158"])
-
-
-# ╔═════════════════════════════════════════════════════════════════════════════
-# ║  GIVING VIEW
-# ╚═════════════════════════════════════════════════════════════════════════════
-elif view == "giving":
-
-    st.markdown(f"""
-    <div class="hero-balance">
-        <div class="hero-label">Charitable Balance</div>
-        <div class="hero-amount give-color">{fmt_abs(giving_total)}</div>
-        <div class="hero-sub">Set aside for giving · Making a difference</div>
-    </div>""", unsafe_allow_html=True)
-
-    st.markdown('<div class="section-label">Contribution Ledger</div>', unsafe_allow_html=True)
-    srch_g = st.text_input("Search", placeholder="🔍  Search contributions…",
-                            label_visibility="collapsed", key="srch_give")
-    disp_g = give_df[give_df["name"].str.contains(srch_g, case=False, na=False)] \
-             if srch_g else give_df
-    render_ledger(disp_g, "giving")
-
-    if not give_df.empty:
-        st.markdown('<div class="section-label">Giving History</div>', unsafe_allow_html=True)
-        chron_g = give_df.iloc[::-1].reset_index(drop=True)
-        st.line_chart(pd.DataFrame({"Charitable": chron_g["giving"].cumsum()}),
-                      color=["#0a84ff"])
+        md(cached("estimate", price_input, build=lambda: estimate_html(price_input)))
+
+
+@fragment("ledger")
+def ledger_panel(col, title, placeholder, key):
+    md(f'<div class="section-label">{title}</div>')
+    query = st.text_input("Search", placeholder=placeholder,
+                          label_visibility="collapsed", key=key,
+                          on_change=set_page, args=(key, 0))
+    render_ledger(col, query, key)
+
+
+@fragment("switcher")
+def view_switcher():
+    view = st.session_state["active_view"]
+
+    # ── Clickable pill cards (native st.button — instant, zero-reload) ────────
+    pill_col1, pill_col2, pill_col3 = st.columns(3)
+
+    with pill_col1:
+        if view == "spending":
+            md('<div class="pill-active-spend">')
+        st.button(
+            f"DISCRETIONARY\n{fmt_abs(spending_total)}",
+            key="pill_spend", use_container_width=True,
+            on_click=set_view, args=("spending",)
+        )
+        if view == "spending":
+            md('</div>')
+
+    with pill_col2:
+        if view == "savings":
+            md('<div class="pill-active-save">')
+        st.button(
+            f"RESERVES\n{fmt_abs(savings_total)}",
+            key="pill_save", use_container_width=True,
+            on_click=set_view, args=("savings",)
+        )
+        if view == "savings":
+            md('</div>')
+
+    with pill_col3:
+        if view == "giving":
+            md('<div class="pill-active-give">')
+        st.button(
+            f"CHARITABLE\n{fmt_abs(giving_total)}",
+            key="pill_give", use_container_width=True,
+            on_click=set_view, args=("giving",)
+        )
+        if view == "giving":
+            md('</div>')
+
+    md("<div style='height:4px'></div>")
+
+    # ╔═════════════════════════════════════════════════════════════════════════
+    # ║  SPENDING VIEW
+    # ╚═════════════════════════════════════════════════════════════════════════
+    if view == "spending":
+
+        md(cached("hero", "spending", build=lambda: hero_html(
+            "spending", "Discretionary Balance", "spend-color",
+            "Available to spend · Synced from ledger", spending_total, "I5")))
+
+        estimator()
+        ledger_panel("spending", "Transaction Ledger", "🔍  Search transactions…", "srch_spend")
+
+        if len(model.view("spending")):
+            md('<div class="section-label">Balance History</div>')
+            render_history("spending", "Discretionary", "#ff453a")
+
+    # ╔═════════════════════════════════════════════════════════════════════════
+    # ║  SAVINGS VIEW
+    # ╚═════════════════════════════════════════════════════════════════════════
+    elif view == "savings":
+
+        md(cached("hero", "savings", build=lambda: hero_html(
+            "savings", "Reserve Balance", "save-color",
+            "Long-term reserves · Growing steadily", savings_total, "J5")))
+
+        ledger_panel("savings", "Deposit Ledger", "🔍  Search deposits…", "srch_save")
+
+        if len(model.view("savings")):
+            md('<div class="section-label">Reserve Growth</div>')
+            render_history("savings", "Reserves", "#30d158")
+
+    # ╔═════════════════════════════════════════════════════════════════════════
+    # ║  GIVING VIEW
+    # ╚═════════════════════════════════════════════════════════════════════════
+    elif view == "giving":
+
+        md(cached("hero", "giving", build=lambda: hero_html(
+            "giving", "Charitable Balance", "give-color",
+            "Set aside for giving · Making a difference", giving_total, "K5")))
+
+        ledger_panel("giving", "Contribution Ledger", "🔍  Search contributions…", "srch_give")
+
+        if len(model.view("giving")):
+            md('<div class="section-label">Giving History</div>')
+            render_history("giving", "Charitable", "#0a84ff")
+
+
+view_switcher()
 
 
 # ── Footer ────────────────────────────────────────────────────────────────────
-st.markdown("<div style='height:24px'></div>", unsafe_allow_html=True)
+md("<div style='height:24px'></div>")
 c1, c2, c3 = st.columns([1,2,1])
 with c2:
-    if st.button("↻  Sync Ledger", use_container_width=True):
-        st.cache_data.clear()
-        st.rerun()
-st.markdown('<div class="footer-text">Personal Finance · Secure Account Access</div>',
-            unsafe_allow_html=True)
+    if not OFFLINE and st.button("↻  Sync Ledger", use_container_width=True):
+        try:
+            tokens.call(service().sync)
+        except Exception as e:
+            st.error(f"Unable to sync: {e}")
+        else:
+            st.rerun()
+md('<div class="footer-text">Personal Finance · Secure Account Access</div>')
+
+metrics.observe("rerun.full", (time.perf_counter() - _rerun_t0) * 1000)
+metrics.gauge("payload.full.bytes", _payload["bytes"])
+
+# ── Diagnostics panel ─────────────────────────────────────────────────────────
+if PROFILE:
+    profiler.disable()
+    st.session_state.pop("_profiler", None)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+    top = tracemalloc.take_snapshot().statistics("lineno")[:25]
+    tracemalloc.stop()
+    st.session_state["_profile_report"] = (out.getvalue(), "\n".join(map(str, top)))
+    del st.query_params["profile"]      # one run only
+
+if DEBUG:
+    with st.expander("Diagnostics", expanded=True):
+        st.dataframe(pd.DataFrame([("  " * depth + name, start, ms) for name, depth, start, ms in _spans],
+                                  columns=["span", "start ms", "ms"]),
+                     hide_index=True, use_container_width=True)
+        snap = metrics.snapshot()
+        c1, c2 = st.columns(2)
+        c1.download_button("metrics.json", json.dumps(snap, indent=2, sort_keys=True),
+                           "metrics.json", "application/json", use_container_width=True)
+        c2.download_button("metrics.prom", metrics.prometheus(),
+                           "metrics.prom", "text/plain", use_container_width=True)
+        st.json(snap, expanded=False)
+        report = st.session_state.get("_profile_report")
+        if report:
+            st.caption("cProfile, by cumulative time")
+            st.code(report[0])
+            st.caption("tracemalloc, top allocations")
+            st.code(report[1])
+metrics.end_trace()
+
+# ── Background refresh of a stale copy ────────────────────────────────────────
+# The page above was drawn from an on-disk snapshot or a cache entry older than
+# CACHE_TTL. The poll it kicked is left running: a small fragment checks it every
+# few seconds without holding up the script. The fragment only exists while a
+# poll is pending, so once the poll settles it ends with one full rerun, which
+# also stops the timer (and redraws the ledger if it changed).
+if pending is not None:
+    st.session_state["_pending"] = pending
+
+@st.fragment(run_every=3)
+def refresh_watch():
+    fut = st.session_state.get("_pending")
+    if fut is not None and not fut.done():
+        return
+    st.session_state.pop("_pending", None)
+    if fut is not None and fut.exception() is not None:
+        metrics.incr("snapshot.refresh_errors")
+    st.rerun(scope="app")
 
+if "_pending" in st.session_state:
+    refresh_watch()
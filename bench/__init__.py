@@ -0,0 +1 @@
+# Offline benchmarks; run from the repo root, e.g. `python -m bench.bench_parse`.
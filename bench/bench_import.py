@@ -0,0 +1,51 @@
+import argparse
+import subprocess
+import sys
+
+# What a cold process imports up to each point. "eager" is the set app.py
+# imported at the top before the page became a thin layer over finance_core.
+SCENARIOS = {
+    "signin": ["streamlit", "streamlit.components.v1", "finance_core.auth",
+               "finance_core.estimator", "finance_core.formatting", "finance_core.metrics",
+               "finance_core.render", "finance_core.sheets"],
+    "data":   ["streamlit", "streamlit.components.v1", "finance_core.auth",
+               "finance_core.estimator", "finance_core.formatting", "finance_core.metrics",
+               "finance_core.render", "finance_core.sheets", "finance_core.service", "pandas"],
+    "eager":  ["streamlit", "streamlit.components.v1", "pandas", "finance_core.auth",
+               "finance_core.ledger", "finance_core.metrics", "finance_core.render",
+               "finance_core.snapshot", "finance_core.transport", "finance_core.cache",
+               "finance_core.formatting"],
+    "core.auth":    ["finance_core.auth"],
+    "core.service": ["finance_core.service"],
+}
+
+
+# Total of -X importtime's self times, in ms, for one fresh interpreter.
+def import_ms(modules):
+    stmt = "; ".join(f"import {m}" for m in modules)
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", stmt],
+                         capture_output=True, text=True, check=True).stderr
+    total = 0
+    for line in err.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            field = line.split(":", 1)[1].split("|")[0].strip()
+            if field.isdigit():
+                total += int(field)
+    return total / 1000
+
+def best_ms(modules, repeat):
+    return min(import_ms(modules) for _ in range(repeat))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Cold import time of the page and the core.")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    print(f"{'scenario':<14} {'best ms':>8}")
+    for name, modules in SCENARIOS.items():
+        print(f"{name:<14} {best_ms(modules, args.repeat):>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
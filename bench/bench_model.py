@@ -0,0 +1,23 @@
+import argparse
+
+from bench.bench_parse import as_columns, synthetic
+from finance_core import ledger
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Ledger memory: parsed frame vs compact model.")
+    ap.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = ap.parse_args(argv)
+
+    print(f"{'rows':>8} {'frame KiB':>10} {'model KiB':>10} {'ratio':>7} {'combined KiB':>13}")
+    for n in args.rows:
+        raw = ledger.raw_frame(as_columns(synthetic(n)))
+        state = ledger.EMPTY.extend(raw, (0.0, 0.0, 0.0))
+        combined = ledger.Combined([state], ["bench"])
+        model = combined.model()
+        print(f"{n:>8} {model.frame_bytes/1024:>10.0f} {model.nbytes/1024:>10.0f} "
+              f"{model.frame_bytes/model.nbytes:>6.1f}x {combined.nbytes/1024:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from finance_core import ledger
+
+
+# The per-cell parser fetch_data used before column-oriented parsing, kept
+# verbatim as the baseline.
+def legacy_parse(rows):
+    def f(v):
+        try: return float(str(v).replace(",","").replace("$",""))
+        except: return 0.0
+    records = []
+    for r in rows:
+        name = r[0] if r else ""
+        if not name: continue
+        records.append({"name":name,
+            "spending": f(r[1]) if len(r)>1 and r[1] else 0.0,
+            "savings":  f(r[2]) if len(r)>2 and r[2] else 0.0,
+            "giving":   f(r[3]) if len(r)>3 and r[3] else 0.0,
+        })
+    return pd.DataFrame(records) if records else pd.DataFrame(
+        columns=["name","spending","savings","giving"])
+
+
+def synthetic(n, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        row = [f"Transaction {i}", "", "", ""]
+        row[rng.randint(1, 3)] = round(rng.uniform(-500, 500), 2)
+        rows.append(row)
+    return rows
+
+def formatted(rows):
+    return [[r[0]] + [f"${v:,.2f}" if v != "" else "" for v in r[1:]] for r in rows]
+
+def as_columns(rows):
+    return [list(c) for c in zip(*rows)]
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Ledger parsing: per-cell loop vs column-oriented.")
+    ap.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    print(f"{'rows':>8} {'input':>10} {'legacy ms':>10} {'vector ms':>10} {'speedup':>8}")
+    for n in args.rows:
+        unformatted = synthetic(n)
+        for label, rows in (("unformatted", unformatted), ("formatted", formatted(unformatted))):
+            cols = as_columns(rows)
+            old = best_of(lambda: legacy_parse(rows), args.repeat)
+            new = best_of(lambda: ledger.parse(ledger.raw_frame(cols)), args.repeat)
+            pd.testing.assert_frame_equal(
+                legacy_parse(rows), ledger.parse(ledger.raw_frame(cols)), check_dtype=False)
+            print(f"{n:>8} {label:>10} {old*1e3:>10.1f} {new*1e3:>10.1f} {old/new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import time
+
+import numpy as np
+
+from bench.bench_parse import as_columns, synthetic
+from finance_core import ledger, render
+from finance_core.formatting import color_cls, fmt, tx_icon, tx_type
+
+PAGE_ROWS = 50
+
+
+# render_ledger before windowing: every row, iterrows and string +=.
+def legacy_html(data, col):
+    html = ""
+    for _, r in data.iterrows():
+        v = r[col]
+        icon, icls = tx_icon(v)
+        html += f"""
+        <div class="ledger-row">
+            <div class="l-icon {icls}">{icon}</div>
+            <div class="l-info">
+                <div class="l-name">{r['name']}</div>
+                <div class="l-type">{tx_type(v)}</div>
+            </div>
+            <div class="l-amt {color_cls(v)}">{fmt(v)}</div>
+        </div>"""
+    return f'<div class="ledger">{html}</div>'
+
+def page_html(model, col, idx):
+    window = idx[:PAGE_ROWS]
+    return render.ledger_html(model.names_at(window), model.cents[col][window])
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Ledger HTML: full render vs one page.")
+    ap.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = ap.parse_args(argv)
+
+    print(f"{'rows':>8} {'full KiB':>9} {'full ms':>9} {'page KiB':>9} {'page ms':>8}")
+    for n in args.rows:
+        raw = ledger.raw_frame(as_columns(synthetic(n)))
+        combined = ledger.Combined([ledger.EMPTY.extend(raw, (0.0, 0.0, 0.0))], ["bench"])
+        model, df = combined.model(), combined.frame
+        spend_df = df[df["spending"] != 0].reset_index(drop=True)
+        full, t_full = timed(lambda: legacy_html(spend_df, "spending"))
+        page, t_page = timed(lambda: page_html(model, "spending", model.view("spending")))
+        assert np.array_equal(model.names_at(model.view("spending")), spend_df["name"].to_numpy())
+        print(f"{n:>8} {len(full.encode())/1024:>9.0f} {t_full*1e3:>9.1f} "
+              f"{len(page.encode())/1024:>9.1f} {t_page*1e3:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
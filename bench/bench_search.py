@@ -0,0 +1,44 @@
+import argparse
+import time
+
+import numpy as np
+
+from bench.bench_parse import best_of
+from bench.standin import synthetic
+from finance_core import ledger
+
+QUERIES = ["coffee", "gro", "am", "rent payroll", "dinner >20", "<-100", "fuel <=-15.50"]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Ledger search: str.contains scan vs search index.")
+    ap.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args(argv)
+
+    for n in args.rows:
+        raw = ledger.raw_frame(synthetic(n))
+        combined = ledger.Combined([ledger.EMPTY.extend(raw, (0.0, 0.0, 0.0))], ["bench"])
+        model, df = combined.model(), combined.frame
+        spend_df = df[df["spending"] != 0].reset_index(drop=True)
+        t0 = time.perf_counter()
+        model.index()
+        build = time.perf_counter() - t0
+        print(f"\n{n:,} rows  (index build {build*1e3:.0f} ms)")
+        print(f"  {'query':<16} {'hits':>7} {'scan ms':>9} {'index ms':>9}")
+        for q in QUERIES:
+            hits = model.search("spending", q)
+            idx_ms = best_of(lambda: model.search("spending", q), args.repeat) * 1e3
+            terms = [t for t in q.split() if t[0] not in "<>="]
+            if terms and len(terms) == len(q.split()):
+                scan = lambda: [spend_df["name"].str.contains(t, case=False, regex=False) for t in terms]
+                scan_ms = f"{best_of(scan, args.repeat) * 1e3:9.2f}"
+                mask = np.logical_and.reduce(scan())
+                assert mask.sum() == len(hits), q
+            else:
+                scan_ms = f"{'—':>9}"
+            print(f"  {q:<16} {len(hits):>7} {scan_ms} {idx_ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import argparse
+import json
+import logging
+import os
+import resource
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from bench.standin import StandIn
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+# ── Concurrent-session load test ──────────────────────────────────────────────
+# Drives N simulated sessions through the real script with streamlit's AppTest,
+# all in this process against bench/standin.py, so they share the caches,
+# connection pool and single-flight groups the way sessions on one server do.
+# The browser-side session_store component cannot answer under AppTest; a
+# restored sign-in is simulated by seeding token_info as it would hand it over.
+
+# AppTest is built for one test at a time, so two things are shared here the
+# way one server shares them between its sessions:
+# - The compiled script. AppTest compiles it into a fresh cache on every run,
+#   and compiling on several threads at once is not safe on CPython 3.11.
+# - The runtime. Each run installs a mock Runtime and clears it again when it
+#   ends, which would pull it out from under the other sessions. The first
+#   run's mock is kept for all of them.
+def share_apptest_state():
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    shared = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: shared
+
+    class Pinned(type(Runtime)):
+        def __setattr__(cls, name, value):
+            if name != "_instance":
+                super().__setattr__(name, value)
+            elif Runtime._instance is None:
+                Runtime._instance = value
+    app_test.Runtime = Pinned("Runtime", (Runtime,), {})
+
+# Server time of each run as the page itself measures it: the whole script,
+# and the span of each fragment. Under AppTest every interaction reruns the
+# whole script; on a server, one inside a fragment reruns only that fragment,
+# so the two are the cost of an interaction without and with fragments. The
+# page's trace is handed over through session state when it closes.
+FRAGMENTS = {"pill": "switcher", "estimator": "estimator", "search": "ledger"}
+
+def capture_traces():
+    import streamlit as st
+    from finance_core import metrics
+
+    end = metrics.end_trace
+    def end_trace():
+        trace = getattr(metrics._local, "trace", None)
+        if trace is not None:
+            st.session_state["_bench_trace"] = (trace[0], (time.perf_counter() - trace[1]) * 1e3)
+        end()
+    metrics.end_trace = end_trace
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024    # peak, on Linux
+
+def secrets(args, snapshot_dir):
+    return {"CLIENT_ID": "loadtest", "CLIENT_SECRET": "loadtest",
+            "SPREADSHEET_ID": "bench", "SHEET_NAME": "Ledger",
+            "TAX_RATE": "0.07", "HOURLY_RATE": "20",
+            "CACHE_TTL": args.cache_ttl, "SNAPSHOT_DIR": snapshot_dir}
+
+
+class Session:
+    def __init__(self, i, args, standin, snapshot_dir):
+        from streamlit.testing.v1 import AppTest
+        self.at = AppTest.from_file(APP, default_timeout=args.timeout)
+        for k, v in secrets(args, snapshot_dir).items():
+            self.at.secrets[k] = v
+        user = f"u{i % args.users}" if args.users else f"u{i}"
+        self.at.session_state["token_info"] = {
+            "access_token": f"user:{user}", "expires_in": 3600,
+            "refresh_token": f"refresh:{user}"}
+        self.standin = standin
+        self.samples = []       # (action, ms)
+        self.server  = []       # (action, script ms, fragment ms)
+        self.errors  = 0
+
+    def step(self, action, fn=None):
+        t0 = time.perf_counter()
+        (fn() if fn else self.at).run()
+        self.samples.append((action, (time.perf_counter() - t0) * 1e3))
+        self.errors += len(self.at.exception)
+        trace = self.at.session_state["_bench_trace"] if "_bench_trace" in self.at.session_state else None
+        if trace is not None and action in FRAGMENTS:
+            spans, script_ms = trace
+            name = "rerun." + FRAGMENTS[action]
+            self.server.append((action, script_ms, sum(ms for n, _, _, ms in spans if n == name)))
+
+    def script(self, rounds):
+        at = self.at
+        self.step("restore")
+        for _ in range(rounds):
+            for key in ("pill_save", "pill_give", "pill_spend"):
+                self.step("pill", at.button(key=key).click)
+            for price in (4.0, 45.0, 459.99):
+                self.step("estimator", lambda p=price: at.number_input(key="price_est").set_value(p))
+            for query in ("co", "coffee", ""):
+                self.step("search", lambda q=query: at.text_input(key="srch_spend").set_value(q))
+            self.standin.append([["Load test", -1.25, "", ""]])
+            sync = next(b for b in at.button if "Sync Ledger" in b.label)
+            self.step("sync", sync.click)
+
+    def close(self):
+        if "tokens" in self.at.session_state:
+            self.at.session_state["tokens"].close()
+
+
+def run_level(n, args, standin):
+    import streamlit as st
+    from finance_core import metrics
+
+    st.cache_resource.clear()       # each level starts as a fresh server
+    metrics.reset()
+    standin.reset_stats()
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        sessions = [Session(i, args, standin, snapshot_dir) for i in range(n)]
+        start = threading.Barrier(n)
+        def drive(s):
+            start.wait()
+            s.script(args.rounds)
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            list(pool.map(drive, sessions))
+        wall = time.perf_counter() - t0
+        for s in sessions: s.close()
+
+    ms = np.array([t for s in sessions for _, t in s.samples])
+    snap = metrics.snapshot()
+    up = standin.stats()
+    by_action, server = {}, {}
+    for s in sessions:
+        for action, t in s.samples:
+            by_action.setdefault(action, []).append(t)
+        for action, script_ms, fragment_ms in s.server:
+            server.setdefault(action, ([], []))
+            server[action][0].append(script_ms)
+            server[action][1].append(fragment_ms)
+    p95 = lambda v: round(float(np.percentile(v, 95)), 1)
+    return {
+        "sessions": n, "runs": len(ms), "errors": sum(s.errors for s in sessions),
+        "wall_s": round(wall, 2),
+        "p50_ms": round(float(np.percentile(ms, 50)), 1),
+        "p95_ms": round(float(np.percentile(ms, 95)), 1),
+        "p99_ms": round(float(np.percentile(ms, 99)), 1),
+        "max_ms": round(float(ms.max()), 1),
+        "p95_by_action": {a: p95(v) for a, v in by_action.items()},
+        "server_p95_by_action": {a: {"script": p95(full), "fragment": p95(frag)}
+                                 for a, (full, frag) in server.items()},
+        "upstream_requests": up["total"], "upstream_bytes": up["bytes"],
+        "upstream_by_endpoint": {k: v for k, v in up["requests"].items()
+                                 if not k.startswith("status.")},
+        "ledger_cache_hit_ratio": snap.get("ledger_cache.hit_ratio"),
+        "render_cache_hit_ratio": snap.get("render_cache.hit_ratio"),
+        "rss_mb": round(rss_mb(), 1),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Ramp simulated sessions through app.py.")
+    ap.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    ap.add_argument("--rounds", type=int, default=2, help="interaction rounds per session")
+    ap.add_argument("--users", type=int, default=0,
+                    help="distinct users shared by the sessions (0 = one per session)")
+    ap.add_argument("--rows", type=int, default=10_000)
+    ap.add_argument("--latency", type=float, default=0.05,
+                    help="seconds the stand-in adds to every upstream call")
+    ap.add_argument("--quota", type=int, default=None)
+    ap.add_argument("--cache-ttl", type=float, default=60)
+    ap.add_argument("--timeout", type=float, default=120)
+    ap.add_argument("--out", help="write the results as JSON")
+    args = ap.parse_args(argv)
+
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    share_apptest_state()
+    capture_traces()
+    with StandIn(rows=args.rows, latency=args.latency, quota=args.quota) as standin:
+        os.environ.update(standin.env())
+        standin.point_core()
+        results = []
+        print(f"{'sessions':>8} {'runs':>5} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'upstream':>8} {'ledger hit':>10} {'render hit':>10} {'RSS MB':>7}")
+        for n in args.sessions:
+            r = run_level(n, args, standin)
+            results.append(r)
+            hit = lambda v: f"{v:.0%}" if v is not None else "—"
+            print(f"{n:>8} {r['runs']:>5} {r['errors']:>4} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+                  f"{r['p99_ms']:>8.1f} {r['upstream_requests']:>8} "
+                  f"{hit(r['ledger_cache_hit_ratio']):>10} {hit(r['render_cache_hit_ratio']):>10} "
+                  f"{r['rss_mb']:>7.0f}")
+        print("\nserver p95 ms per interaction: whole script vs fragment")
+        for r in results:
+            print(f"{r['sessions']:>8}  " + "  ".join(
+                f"{a} {v['script']:.1f} → {v['fragment']:.1f}" for a, v in r["server_p95_by_action"].items()))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"args": vars(args), "levels": results}, f, indent=2)
+        print(f"\nwrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import urllib.parse
+from collections import Counter, defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ── Local Google Sheets / OAuth stand-in ──────────────────────────────────────
+# Just enough of values.get, values:batchGet, values:append, spreadsheets.get,
+# the OAuth authorize/token endpoints and tokeninfo to run the app, the
+# benchmarks and the load test offline. Point the app at it with the env vars
+# from StandIn.env(), or in-process with StandIn.point_core().
+#
+# Any bearer token of the form "user:<sub>" is accepted as <sub>; tokens the
+# server issues itself expire after token_ttl. Latency, jitter, error_rate and
+# quota (requests per minute per token, 429 beyond it) can be changed while the
+# server runs.
+
+FIRST_ROW = 3                  # ledger rows start at A3, as in ledger.FIRST_ROW
+TOTALS    = (5, 8)             # I5:K5
+SLACK     = 100                # spare grid rows past the data, like a real sheet
+
+WORDS = ["coffee", "grocery", "rent", "payroll", "transfer", "amazon", "target",
+         "fuel", "pharmacy", "dinner", "book", "gift", "utility", "insurance"]
+
+_A1 = re.compile(r"^(?:'((?:[^']|'')*)'|([^!']+))(?:!([A-Z]+)(\d*)(?::([A-Z]+)(\d*))?)?$")
+
+
+def col_index(letters):
+    n = 0
+    for ch in letters:
+        n = n * 26 + ord(ch) - 64
+    return n - 1
+
+def parse_a1(rng):
+    m = _A1.match(rng)
+    if m is None:
+        raise ValueError(f"Unable to parse range: {rng}")
+    quoted, bare, c1, r1, c2, r2 = m.groups()
+    sheet = quoted.replace("''", "'") if quoted is not None else bare
+    if c1 is None:
+        return sheet, 0, 1, None, None
+    if c2 is None:
+        c2, r2 = c1, r1
+    return sheet, col_index(c1), int(r1 or 1), col_index(c2), int(r2) if r2 else None
+
+
+# Ledger columns as the API returns them: one amount per row, blanks as "".
+def synthetic(n, seed=0):
+    rng = random.Random(seed)
+    cols = [[], [], [], []]
+    for _ in range(n):
+        cols[0].append(f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} #{rng.randint(1, 500)}")
+        hit = rng.randint(1, 3)
+        for c in (1, 2, 3):
+            cols[c].append(round(rng.uniform(-500, 500), 2) if c == hit else "")
+    return cols
+
+
+class Sheet:
+    def __init__(self, columns):
+        self.columns = [list(c) for c in columns] + [[] for _ in range(4 - len(columns))]
+        self.lock    = threading.Lock()
+
+    @property
+    def last_row(self):
+        return FIRST_ROW - 1 + len(self.columns[0])
+
+    @property
+    def row_count(self):
+        return max(1000, self.last_row + SLACK)
+
+    def totals(self):
+        return [round(sum(v for v in c if v != ""), 2) for c in self.columns[1:]]
+
+    def cell_column(self, c, r1, r2):
+        if c < 4:
+            data = self.columns[c]
+            lo, hi = max(r1, FIRST_ROW), min(r2, self.last_row)
+            return [""] * (min(FIRST_ROW, r2 + 1) - r1 if r1 < FIRST_ROW else 0) + \
+                data[lo - FIRST_ROW:hi - FIRST_ROW + 1]
+        row, first = TOTALS
+        if first <= c < first + 3 and r1 <= row <= r2:
+            return [""] * (row - r1) + [self.totals()[c - first]]
+        return []
+
+    def values(self, c1, r1, c2, r2, major="ROWS"):
+        with self.lock:
+            r2 = r2 if r2 is not None else max(self.last_row, TOTALS[0])
+            cols = [self.cell_column(c, r1, r2) for c in range(c1, c2 + 1)]
+        if major != "COLUMNS":
+            width = len(cols)
+            height = max((len(c) for c in cols), default=0)
+            cols = [[cols[j][i] if i < len(cols[j]) else "" for j in range(width)]
+                    for i in range(height)]
+        grid = [trim(line) for line in cols]
+        while grid and not grid[-1]:
+            grid.pop()
+        return grid
+
+    def append(self, rows):
+        with self.lock:
+            start = self.last_row + 1
+            for row in rows:
+                row = list(row) + [""] * (4 - len(row))
+                for c in range(4):
+                    self.columns[c].append(row[c])
+            return start, self.last_row
+
+def trim(line):
+    n = len(line)
+    while n and line[n - 1] == "":
+        n -= 1
+    return line[:n]
+
+
+class StandIn:
+    def __init__(self, rows=1_000, spreadsheet_id="bench", sheet="Ledger", latency=0.0,
+                 jitter=0.0, error_rate=0.0, quota=None, token_ttl=3600,
+                 host="127.0.0.1", port=0, seed=0):
+        self.latency, self.jitter, self.error_rate = latency, jitter, error_rate
+        self.quota, self.token_ttl = quota, token_ttl
+        self.spreadsheet_id, self.sheet = spreadsheet_id, sheet
+        self.books  = defaultdict(dict)     # spreadsheet id -> {tab: Sheet}
+        self.tokens = {}                    # access token -> (sub, expires_at)
+        self.grants = {}                    # refresh token / code -> sub
+        self.lock   = threading.Lock()
+        self.calls  = deque()               # (time, token) for the quota window
+        self.counts = Counter()
+        self.bytes  = 0
+        self._rng   = random.Random(seed)
+        self._seq   = 0
+        self.add_sheet(spreadsheet_id, sheet, rows, seed)
+        self.server = ThreadingHTTPServer((host, port), _handler(self))
+        self.server.daemon_threads = True
+        self._thread = None
+
+    # ── Control ──
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True,
+                                        name="sheets-standin")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def env(self):
+        return {"SHEETS_API_URL": f"{self.url}/v4/spreadsheets",
+                "OAUTH2_URL": self.url,
+                "OAUTH2_AUTH_URL": f"{self.url}/o/oauth2/v2/auth"}
+
+    # For code that imported finance_core before the env vars were set.
+    def point_core(self):
+        from finance_core import auth, sheets
+        env = self.env()
+        sheets.SHEETS_API  = env["SHEETS_API_URL"]
+        auth.AUTH_URL      = env["OAUTH2_AUTH_URL"]
+        auth.TOKENINFO_URL = self.url + "/tokeninfo"
+        auth.TOKEN_URL     = self.url + "/token"
+
+    def add_sheet(self, spreadsheet_id, sheet, rows=0, seed=0):
+        columns = synthetic(rows, seed) if rows else [[], [], [], []]
+        self.books[spreadsheet_id][sheet] = Sheet(columns)
+
+    def append(self, rows, spreadsheet_id=None, sheet=None):
+        return self.books[spreadsheet_id or self.spreadsheet_id][sheet or self.sheet].append(rows)
+
+    def stats(self):
+        with self.lock:
+            return {"requests": dict(self.counts), "bytes": self.bytes,
+                    "total": sum(n for k, n in self.counts.items() if not k.startswith("status."))}
+
+    def reset_stats(self):
+        with self.lock:
+            self.counts.clear()
+            self.bytes = 0
+
+    # ── Tokens ──
+    def issue(self, sub):
+        with self.lock:
+            self._seq += 1
+            token = f"at-{sub}-{self._seq}"
+            self.tokens[token] = (sub, time.time() + self.token_ttl)
+        return token
+
+    def subject(self, token):
+        if token.startswith("user:"):
+            return token[5:], None
+        with self.lock:
+            hit = self.tokens.get(token)
+        if hit is None or hit[1] <= time.time():
+            return None, None
+        return hit
+
+    # ── Fault injection ──
+    def fault(self, token):
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            return 503, None
+        if self.quota:
+            now = time.time()
+            with self.lock:
+                while self.calls and self.calls[0][0] <= now - 60:
+                    self.calls.popleft()
+                used = [t for t, tok in self.calls if tok == token]
+                if len(used) >= self.quota:
+                    return 429, max(1, math.ceil(used[0] + 60 - now))
+                self.calls.append((now, token))
+        return None
+
+
+def _handler(standin):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"     # keep-alive, so the client's pool is exercised
+
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status, body, headers=()):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in headers:
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+            with standin.lock:
+                standin.counts[f"status.{status}"] += 1
+                standin.bytes += len(data)
+
+        def error(self, status, message, headers=()):
+            self.reply(status, {"error": {"code": status, "message": message}}, headers)
+
+        def count(self, name):
+            with standin.lock:
+                standin.counts[name] += 1
+
+        def body(self):
+            n = int(self.headers.get("Content-Length") or 0)
+            return self.rfile.read(n).decode() if n else ""
+
+        def do_GET(self):
+            self.route("GET")
+
+        def do_POST(self):
+            self.route("POST")
+
+        def route(self, method):
+            url = urllib.parse.urlsplit(self.path)
+            query = urllib.parse.parse_qs(url.query)
+            path = url.path
+            try:
+                if path == "/token" and method == "POST":
+                    return self.token(urllib.parse.parse_qs(self.body()))
+                if path == "/tokeninfo":
+                    return self.tokeninfo(query)
+                if path == "/o/oauth2/v2/auth":
+                    return self.authorize(query)
+                if path.startswith("/v4/spreadsheets/"):
+                    return self.sheets(method, path[len("/v4/spreadsheets/"):], query)
+                self.error(404, f"no route for {method} {path}")
+            except (KeyError, ValueError) as e:
+                self.error(400, str(e))
+
+        # ── OAuth ──
+        def authorize(self, query):
+            self.count("oauth.authorize")
+            sub = query.get("login_hint", ["user"])[0]
+            with standin.lock:
+                standin._seq += 1
+                code = f"code-{standin._seq}"
+                standin.grants[code] = sub
+            params = {"code": code}
+            if "state" in query:
+                params["state"] = query["state"][0]
+            target = query["redirect_uri"][0] + "?" + urllib.parse.urlencode(params)
+            self.send_response(302)
+            self.send_header("Location", target)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def token(self, form):
+            self.count("oauth.token")
+            failed = standin.fault("oauth")
+            if failed:
+                return self.error(failed[0], "injected failure")
+            grant = form.get("grant_type", [""])[0]
+            key = form.get("code" if grant == "authorization_code" else "refresh_token", [""])[0]
+            with standin.lock:
+                sub = standin.grants.pop(key, None) if grant == "authorization_code" \
+                    else standin.grants.get(key)
+            if sub is None and key.startswith("refresh:"):
+                sub = key[len("refresh:"):]
+            if sub is None:
+                return self.reply(400, {"error": "invalid_grant"})
+            body = {"access_token": standin.issue(sub), "expires_in": standin.token_ttl,
+                    "token_type": "Bearer", "scope": "openid"}
+            if grant == "authorization_code":
+                body["refresh_token"] = f"refresh:{sub}"
+            self.reply(200, body)
+
+        def tokeninfo(self, query):
+            self.count("oauth.tokeninfo")
+            sub, expires = standin.subject(query.get("access_token", [""])[0])
+            if sub is None:
+                return self.reply(400, {"error": "invalid_token"})
+            ttl = standin.token_ttl if expires is None else int(expires - time.time())
+            self.reply(200, {"sub": sub, "expires_in": ttl, "scope": "openid"})
+
+        # ── Sheets ──
+        def sheets(self, method, rest, query):
+            token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+            if standin.subject(token)[0] is None:
+                return self.error(401, "Request had invalid authentication credentials.")
+            failed = standin.fault(token)
+            if failed:
+                status, retry = failed
+                return self.error(status, "injected failure",
+                                  [("Retry-After", str(retry))] if retry else ())
+            spreadsheet_id, _, tail = rest.partition("/")
+            book = standin.books.get(spreadsheet_id)
+            if book is None:
+                return self.error(404, "Requested entity was not found.")
+            major = query.get("majorDimension", ["ROWS"])[0]
+
+            if tail == "values:batchGet" and method == "GET":
+                self.count("sheets.batchGet")
+                out = [self.value_range(book, r, major) for r in query.get("ranges", [])]
+                return self.reply(200, {"spreadsheetId": spreadsheet_id, "valueRanges": out})
+            if tail.startswith("values/"):
+                rng = urllib.parse.unquote(tail[len("values/"):])
+                if rng.endswith(":append") and method == "POST":
+                    self.count("sheets.append")
+                    sheet = parse_a1(rng[:-len(":append")])[0]
+                    rows = json.loads(self.body() or "{}").get("values", [])
+                    lo, hi = book[sheet].append(rows)
+                    return self.reply(200, {"spreadsheetId": spreadsheet_id, "updates": {
+                        "updatedRange": f"'{sheet}'!A{lo}:D{hi}", "updatedRows": len(rows)}})
+                if method == "GET":
+                    self.count("sheets.get")
+                    return self.reply(200, self.value_range(book, rng, major))
+            if not tail and method == "GET":
+                self.count("sheets.spreadsheet")
+                return self.reply(200, {"spreadsheetId": spreadsheet_id, "sheets": [
+                    {"properties": {"title": title, "gridProperties": {
+                        "rowCount": sh.row_count, "columnCount": 26}}}
+                    for title, sh in book.items()]})
+            self.error(404, f"no route for {method} {tail}")
+
+        def value_range(self, book, rng, major):
+            sheet, c1, r1, c2, r2 = parse_a1(rng)
+            if sheet not in book:
+                raise ValueError(f"Unable to parse range: {rng}")
+            c2 = 25 if c2 is None else c2
+            out = {"range": rng, "majorDimension": major}
+            grid = book[sheet].values(c1, r1, c2, r2, major)
+            if grid:
+                out["values"] = grid
+            return out
+
+    return Handler
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Local Google Sheets / OAuth stand-in.")
+    ap.add_argument("--rows", type=int, default=1_000)
+    ap.add_argument("--spreadsheet-id", default="bench")
+    ap.add_argument("--sheet", default="Ledger")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", type=float, default=0.0, help="seconds added to each call")
+    ap.add_argument("--jitter", type=float, default=0.0, help="up to this many more seconds")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls failing 503")
+    ap.add_argument("--quota", type=int, default=None, help="requests per minute per token")
+    ap.add_argument("--token-ttl", type=int, default=3600)
+    args = ap.parse_args(argv)
+
+    standin = StandIn(args.rows, args.spreadsheet_id, args.sheet, args.latency, args.jitter,
+                      args.error_rate, args.quota, args.token_ttl, port=args.port)
+    print(f"Serving {args.rows:,} rows as {args.spreadsheet_id}/{args.sheet} on {standin.url}")
+    for k, v in standin.env().items():
+        print(f"  {k}={v}")
+    print("  bearer tokens of the form user:<name> are always accepted")
+    try:
+        standin.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench.bench_import import SCENARIOS, import_ms
+from bench.standin import StandIn
+from finance_core import ledger, render
+from finance_core.model import LedgerModel
+
+PAGE_ROWS    = 50
+CHART_POINTS = 400
+TOKEN        = "user:bench"
+QUERIES      = ["coffee", "gro", "am", "rent payroll", "dinner >20", "<-100"]
+
+
+# ── Offline benchmark suite ───────────────────────────────────────────────────
+# Times each stage of a page load against bench/standin.py at several ledger
+# sizes and writes the results as JSON; --compare flags stages that got slower
+# than a previous run. fetch.* go through the real transport and Sheets client
+# (what fetch_data calls), the rest work on the resulting model.
+
+def measure(fn, repeat, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup: setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1e3)
+    return {"best_ms": round(min(times), 3), "median_ms": round(statistics.median(times), 3),
+            "runs": repeat}
+
+def upstream(standin, fn):
+    standin.reset_stats()
+    fn()
+    s = standin.stats()
+    return {"requests": s["total"], "bytes": s["bytes"]}
+
+
+def run_size(n, args):
+    out = {}
+    with StandIn(rows=n, latency=args.latency) as standin:
+        standin.point_core()
+        sid, sheet = standin.spreadsheet_id, standin.sheet
+        full = lambda: ledger.sync(sid, sheet, TOKEN)
+        out["fetch.full"] = {**measure(full, args.repeat), **upstream(standin, full)}
+
+        state = full()
+        def grow():
+            standin.append([["Bench append", -12.5, "", ""]] * 10)
+        def delta():
+            nonlocal state
+            state = ledger.sync(sid, sheet, TOKEN, state)
+        out["fetch.delta"] = {**measure(delta, args.repeat, setup=grow),
+                              **upstream(standin, lambda: (grow(), delta()))}
+        same = lambda: ledger.sync(sid, sheet, TOKEN, state)
+        deep, ledger.DEEP_CHECK = ledger.DEEP_CHECK, 0.0
+        out["fetch.unchanged"] = {**measure(same, args.repeat), **upstream(standin, same)}
+        ledger.PROBE = False        # the delta check the probe stands in for
+        out["fetch.unchanged_delta"] = {**measure(same, args.repeat), **upstream(standin, same)}
+        ledger.PROBE, ledger.DEEP_CHECK = True, deep
+
+        cols = [list(c) for c in standin.books[sid][sheet].columns]
+    out["parse"] = measure(lambda: ledger.parse(ledger.raw_frame(cols)), args.repeat)
+
+    combined = ledger.Combined([state], ["bench"])
+    out["model"] = measure(lambda: LedgerModel(combined.frame, combined.totals, "bench"),
+                           args.repeat)
+    model = combined.model()
+
+    def drop_index():
+        model._index = None
+    out["filter.index"] = measure(model.index, args.repeat, setup=drop_index)
+    out["filter.query"] = measure(lambda: [model.search("spending", q) for q in QUERIES],
+                                  args.repeat)
+
+    def page(query):
+        window = model.search("spending", query)[:PAGE_ROWS]
+        return render.ledger_html(model.names_at(window), model.cents["spending"][window])
+    out["render.page"] = measure(lambda: page(""), args.repeat)
+    out["render.search_page"] = measure(lambda: page("coffee"), args.repeat)
+
+    def drop_series():
+        model._series.clear()
+    def chart():
+        x, y = model.history_points("spending", CHART_POINTS)
+        return pd.DataFrame({"Discretionary": y}, index=x)
+    out["chart"] = measure(chart, args.repeat, setup=drop_series)
+    return out
+
+
+def meta(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": commit, "python": sys.version.split()[0], "platform": platform.platform(),
+            "pandas": pd.__version__, "numpy": np.__version__,
+            "latency": args.latency, "repeat": args.repeat}
+
+def compare(old, new, threshold):
+    slower = []
+    print(f"\n{'benchmark':<28} {'old ms':>9} {'new ms':>9} {'ratio':>7}")
+    for key, res in new.items():
+        if key not in old:
+            continue
+        ratio = res["best_ms"] / max(old[key]["best_ms"], 1e-6)
+        flag = "  slower" if ratio > threshold else ""
+        print(f"{key:<28} {old[key]['best_ms']:>9.2f} {res['best_ms']:>9.2f} {ratio:>6.2f}x{flag}")
+        if flag: slower.append(key)
+    return slower
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Offline fetch/parse/filter/render/chart benchmarks.")
+    ap.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--latency", type=float, default=0.0,
+                    help="seconds the stand-in adds to every upstream call")
+    ap.add_argument("--out", default="bench-results.json")
+    ap.add_argument("--compare", metavar="OLD.json", help="earlier results to compare against")
+    ap.add_argument("--threshold", type=float, default=1.2,
+                    help="best-time ratio above which a benchmark counts as slower")
+    args = ap.parse_args(argv)
+
+    results = {}
+    print(f"{'benchmark':<28} {'best ms':>9} {'median ms':>10} {'requests':>9} {'KiB':>8}")
+    for name in ("signin", "data"):
+        times = [import_ms(SCENARIOS[name]) for _ in range(args.repeat)]
+        res = {"best_ms": round(min(times), 3), "median_ms": round(statistics.median(times), 3),
+               "runs": args.repeat}
+        results[f"import.{name}"] = res
+        print(f"{'import.' + name:<28} {res['best_ms']:>9.2f} {res['median_ms']:>10.2f}")
+    for n in args.rows:
+        for name, res in run_size(n, args).items():
+            key = f"{name}/{n}"
+            results[key] = res
+            reqs = res.get("requests", "")
+            kib = f"{res['bytes'] / 1024:.0f}" if "bytes" in res else ""
+            print(f"{key:<28} {res['best_ms']:>9.2f} {res['median_ms']:>10.2f} {reqs:>9} {kib:>8}")
+
+    with open(args.out, "w") as f:
+        json.dump({"meta": meta(args), "results": results}, f, indent=2)
+    print(f"\nwrote {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)["results"]
+        if compare(old, results, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
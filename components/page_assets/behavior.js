@@ -0,0 +1,51 @@
+// Clear-on-focus + block scroll-on-enter for number inputs. Runs once in the
+// app's own document; a single MutationObserver binds inputs as Streamlit
+// mounts them instead of re-scanning the page on timers.
+(function() {
+    if (window._hf_behavior) return;
+    window._hf_behavior = true;
+
+    // Block Enter from scrolling page on number inputs
+    document.addEventListener('keydown', function(e) {
+        if (e.key === 'Enter') {
+            var el = document.activeElement;
+            if (el && el.type === 'number') {
+                e.preventDefault();
+                e.stopImmediatePropagation();
+                el.blur();
+            }
+        }
+    }, true);
+
+    // Clear-on-focus for number inputs showing 0
+    function bind(inp) {
+        if (inp._hf_focus) return;
+        inp._hf_focus = true;
+        inp.addEventListener('focus', function() {
+            if (parseFloat(this.value) === 0 || this.value === '0.00') {
+                this.value = '';
+                this.dispatchEvent(new Event('input', {bubbles: true}));
+            }
+        });
+        inp.addEventListener('blur', function() {
+            if (this.value === '' || this.value === null) {
+                this.value = '0.00';
+                this.dispatchEvent(new Event('input', {bubbles: true}));
+            }
+        });
+    }
+
+    function scan(node) {
+        if (node.nodeType !== 1) return;
+        if (node.matches('input[type="number"]')) bind(node);
+        else node.querySelectorAll('input[type="number"]').forEach(bind);
+    }
+
+    new MutationObserver(function(records) {
+        for (var i = 0; i < records.length; i++) {
+            var added = records[i].addedNodes;
+            for (var j = 0; j < added.length; j++) scan(added[j]);
+        }
+    }).observe(document.body, {childList: true, subtree: true});
+    scan(document.body);
+})();
@@ -0,0 +1 @@
+# Headless helpers shared by the Streamlit page (no Streamlit imports here).
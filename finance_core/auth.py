@@ -0,0 +1,170 @@
+import hashlib
+import os
+import threading
+import time
+import urllib.parse
+
+import requests
+
+from . import metrics, transport
+
+# Overridable so benchmarks and load tests can point at bench/standin.py.
+OAUTH2_URL    = os.environ.get("OAUTH2_URL", "https://oauth2.googleapis.com")
+AUTH_URL      = os.environ.get("OAUTH2_AUTH_URL", "https://accounts.google.com/o/oauth2/v2/auth")
+TOKENINFO_URL = OAUTH2_URL + "/tokeninfo"
+TOKEN_URL     = OAUTH2_URL + "/token"
+REFRESH_AHEAD = 300     # renew this many seconds before the access token expires
+INLINE_SLACK  = 60      # …or inline, if a request finds it closer than this
+IDENTITY_TTL  = 60      # re-verify a token with Google at least this often
+
+
+class AuthError(Exception):
+    pass
+
+
+# ── OAuth code flow ───────────────────────────────────────────────────────────
+# Offline access with forced consent, so Google hands out a refresh token.
+def auth_url(client_id, redirect_uri, scopes):
+    return AUTH_URL + "?" + urllib.parse.urlencode({
+        "client_id": client_id, "redirect_uri": redirect_uri,
+        "response_type": "code", "scope": scopes,
+        "access_type": "offline", "prompt": "consent",
+    })
+
+# Not retried: a code is single-use, so a retry after a lost response could
+# only come back invalid_grant and hide what actually went wrong.
+def exchange_code(code, client_id, client_secret, redirect_uri):
+    return transport.post(TOKEN_URL, retries=0, data={
+        "code": code, "client_id": client_id,
+        "client_secret": client_secret, "redirect_uri": redirect_uri,
+        "grant_type": "authorization_code",
+    }).json()
+
+
+# ── Identity ──────────────────────────────────────────────────────────────────
+# Caches are keyed on who the user is, not on the bearer token, so a refreshed
+# token reuses the same entries. Each token is verified with Google and the
+# answer remembered for IDENTITY_TTL seconds (or until the token expires, if
+# sooner); every request goes through identity(), so an expired token never
+# reads cached data and a revoked one stops within IDENTITY_TTL.
+_lock       = threading.Lock()
+_identities = {}    # sha256(token) -> (identity, expires_at)
+
+
+def identity(access_token):
+    h = hashlib.sha256(access_token.encode()).hexdigest()
+    now = time.time()
+    with _lock:
+        hit = _identities.get(h)
+    if hit is not None and hit[1] > now:
+        return hit[0]
+
+    resp = transport.get(TOKENINFO_URL, params={"access_token": access_token})
+    metrics.incr("auth.tokeninfo")
+    if resp.status_code in (400, 401):
+        raise AuthError("Access token was rejected.")
+    resp.raise_for_status()
+    info = resp.json()
+    # Tokens granted before the openid scope was requested carry no subject.
+    ident = info.get("sub") or "token:" + h[:16]
+    with _lock:
+        for k in [k for k, (_, exp) in _identities.items() if exp <= now]:
+            del _identities[k]
+        _identities[h] = (ident, now + min(float(info.get("expires_in", 300)), IDENTITY_TTL))
+    return ident
+
+
+# ── Token manager ─────────────────────────────────────────────────────────────
+# One per session. Keeps the access token alive with the refresh token that the
+# offline grant hands out: a timer renews it shortly before expiry, a request
+# that finds it about to lapse renews it inline, and call() retries once after
+# a 401. Concurrent renewals of the same token collapse into one. The timer
+# only re-arms while the session keeps asking for the token, so an abandoned
+# tab stops refreshing after one cycle.
+class TokenManager:
+    def __init__(self, token_info, client_id, client_secret):
+        info = dict(token_info)
+        # Tokens restored without an expiry stamp are treated as fresh; a 401
+        # on first use still renews them through call().
+        info.setdefault("expires_at", time.time() + float(info.get("expires_in", 0)))
+        self.client_id     = client_id
+        self.client_secret = client_secret
+        self.generation    = 0      # bumped per renewal, so the page knows to persist
+        self._info  = info
+        self._lock  = threading.Lock()
+        self._used  = True
+        self._timer = None
+        with self._lock:
+            self._schedule()
+
+    @property
+    def info(self):
+        return dict(self._info)
+
+    def expires_in(self):
+        return self._info["expires_at"] - time.time()
+
+    def access_token(self):
+        self._used = True
+        token = self._info["access_token"]
+        if self.expires_in() < INLINE_SLACK and self._info.get("refresh_token"):
+            token = self.refresh(token)
+        return token
+
+    def refresh(self, stale=None):
+        with self._lock:
+            if stale is not None and self._info["access_token"] != stale:
+                return self._info["access_token"]     # someone else already renewed it
+            rt = self._info.get("refresh_token")
+            if not rt:
+                raise AuthError("Session expired.")
+            with metrics.timer("auth.refresh"):
+                resp = transport.post(TOKEN_URL, data={
+                    "client_id": self.client_id, "client_secret": self.client_secret,
+                    "refresh_token": rt, "grant_type": "refresh_token",
+                })
+            metrics.incr("auth.refreshes")
+            if resp.status_code in (400, 401):
+                raise AuthError("Refresh token was revoked or has expired.")
+            resp.raise_for_status()
+            new = resp.json()
+            # The refresh token is only in the response when Google rotates it.
+            self._info = {**self._info, **new,
+                          "expires_at": time.time() + float(new.get("expires_in", 3600))}
+            self.generation += 1
+            self._schedule()
+            return self._info["access_token"]
+
+    def call(self, fn, *args, **kw):
+        token = self.access_token()
+        try:
+            return fn(token, *args, **kw)
+        except (AuthError, requests.HTTPError) as e:
+            rejected = isinstance(e, AuthError) or getattr(e.response, "status_code", None) == 401
+            if not rejected or not self._info.get("refresh_token"):
+                raise
+            metrics.incr("auth.retries")
+            return fn(self.refresh(token), *args, **kw)
+
+    def close(self):
+        with self._lock:
+            if self._timer is not None: self._timer.cancel()
+            self._timer = None
+
+    def _schedule(self):
+        if self._timer is not None: self._timer.cancel()
+        self._timer = None
+        if not self._info.get("refresh_token"):
+            return
+        self._timer = threading.Timer(max(self.expires_in() - REFRESH_AHEAD, 0), self._tick)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _tick(self):
+        if not self._used:
+            return
+        self._used = False
+        try:
+            self.refresh(self._info["access_token"])
+        except Exception:
+            metrics.incr("auth.refresh_errors")
@@ -0,0 +1,117 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from . import metrics
+
+
+# Rough resident size: pandas objects report their own (deep) usage, containers
+# are summed, everything else falls back to sys.getsizeof.
+def sizeof(obj):
+    usage = getattr(obj, "memory_usage", None)
+    if callable(usage):
+        n = usage(deep=True)
+        return int(n.sum()) if hasattr(n, "sum") else int(n)
+    nbytes = getattr(obj, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    if isinstance(obj, (tuple, list)):
+        return sys.getsizeof(obj) + sum(sizeof(v) for v in obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(sizeof(k) + sizeof(v) for k, v in obj.items())
+    return sys.getsizeof(obj)
+
+
+# ── Bounded LRU ───────────────────────────────────────────────────────────────
+# Evicts least-recently-used entries once either the entry count or the byte
+# budget is exceeded. Entries remember when they were stored so callers can
+# tell how old a value is (get_aged(), peek()).
+class LRUCache:
+    def __init__(self, max_entries=32, max_bytes=64 << 20, sizeof=sizeof, name="cache"):
+        self.max_entries = max_entries
+        self.max_bytes   = max_bytes
+        self.sizeof      = sizeof
+        self.name        = name
+        self._data  = OrderedDict()     # key -> (value, size, stored_at)
+        self._lock  = threading.RLock()
+        self.hits = self.misses = self.evictions = 0
+        self.bytes = 0
+
+    def get(self, key):
+        with self._lock:
+            e = self._data.get(key)
+            if e is None:
+                self.misses += 1
+                self._publish()
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            self._publish()
+            return e[0]
+
+    # get() plus the entry's age, for callers that serve old entries while
+    # they are being refreshed.
+    def get_aged(self, key):
+        with self._lock:
+            e = self._data.get(key)
+            if e is None:
+                self.misses += 1
+                self._publish()
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            self._publish()
+            return e[0], time.time() - e[2]
+
+    def peek(self, key):
+        with self._lock:
+            e = self._data.get(key)
+            return None if e is None else (e[0], time.time() - e[2])
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            if size > self.max_bytes:
+                self._publish()
+                return False
+            self._data[key] = (value, size, time.time())
+            self.bytes += size
+            while len(self._data) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, s, _) = self._data.popitem(last=False)
+                self.bytes -= s
+                self.evictions += 1
+            self._publish()
+            return True
+
+    def discard(self, pred):
+        with self._lock:
+            for key in [k for k in self._data if pred(k)]:
+                self.bytes -= self._data.pop(key)[1]
+            self._publish()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+            self._publish()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def stats(self):
+        with self._lock:
+            looked = self.hits + self.misses
+            return {"entries": len(self._data), "bytes": self.bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "hit_ratio": self.hits / looked if looked else 0.0}
+
+    def _publish(self):
+        for k, v in self.stats().items():
+            metrics.gauge(f"{self.name}.{k}", v)
@@ -0,0 +1,182 @@
+import argparse
+import json
+import os
+import sys
+import tomllib
+import urllib.parse
+
+from . import auth, ledger
+from .sheets import Source
+
+SCOPES       = "openid https://www.googleapis.com/auth/spreadsheets.readonly"
+REDIRECT_URI = "http://localhost:8501/"
+CREDENTIALS  = os.environ.get("FINANCE_CREDENTIALS", ".finance-credentials.json")
+
+
+# ── Headless command line ─────────────────────────────────────────────────────
+# python -m finance_core {login,sync,export}: the dashboard's ledger for cron
+# jobs and pipelines, without Streamlit or a browser. `login` runs the OAuth
+# consent once and keeps the refresh token; the other commands renew an access
+# token from it through the same TokenManager the page uses. Settings come from
+# the app's secrets file; flags and FINANCE_* variables override them.
+
+def read_json(path):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return None
+
+def settings(args):
+    try:
+        with open(args.secrets, "rb") as fh:
+            return tomllib.load(fh)
+    except FileNotFoundError:
+        return {}
+
+def sources(args, secrets):
+    if args.source:
+        return [Source(s[0], s[1], s[2] if len(s) > 2 else s[1]) for s in args.source]
+    out = [Source(s["spreadsheet_id"], s["sheet"], s.get("label", s["sheet"]))
+           for s in secrets.get("SOURCES", [])]
+    if not out and secrets.get("SPREADSHEET_ID"):
+        out = [Source(secrets["SPREADSHEET_ID"], secrets["SHEET_NAME"], secrets["SHEET_NAME"])]
+    if not out:
+        sys.exit("no sources: pass --source or set SOURCES / SPREADSHEET_ID in the secrets file")
+    return out
+
+def client(args, secrets, creds):
+    cid = (args.client_id or os.environ.get("FINANCE_CLIENT_ID") or creds.get("client_id")
+           or secrets.get("CLIENT_ID"))
+    secret = (args.client_secret or os.environ.get("FINANCE_CLIENT_SECRET")
+              or creds.get("client_secret") or secrets.get("CLIENT_SECRET"))
+    if not (cid and secret):
+        sys.exit("no OAuth client: pass --client-id/--client-secret or set CLIENT_ID / CLIENT_SECRET")
+    return cid, secret
+
+def save_credentials(path, creds):
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as fh:
+        json.dump(creds, fh, indent=2)
+
+# A manager that starts without an access token; the first request renews one.
+# Google may rotate the refresh token, so the stored one is updated on exit.
+class Session:
+    def __init__(self, args, secrets):
+        self.path  = args.credentials
+        self.creds = read_json(self.path) or {}
+        cid, secret = client(args, secrets, self.creds)
+        rt = os.environ.get("FINANCE_REFRESH_TOKEN") or self.creds.get("refresh_token")
+        if not rt:
+            sys.exit(f"no refresh token in {self.path}: run `python -m finance_core login` first")
+        self.tokens = auth.TokenManager({"access_token": "", "expires_in": 0, "refresh_token": rt},
+                                        cid, secret)
+
+    def __enter__(self):
+        return self.tokens
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tokens.close()
+        rt = self.tokens.info.get("refresh_token")
+        if self.creds and rt != self.creds.get("refresh_token"):
+            save_credentials(self.path, {**self.creds, "refresh_token": rt})
+        if isinstance(exc, auth.AuthError):
+            sys.exit(f"sign-in failed: {exc} Run `python -m finance_core login` again.")
+
+
+# ── Commands ──────────────────────────────────────────────────────────────────
+def cmd_login(args, secrets):
+    cid, secret = client(args, secrets, read_json(args.credentials) or {})
+    rt = args.refresh_token
+    if not rt:
+        print("Open this address, allow access, then paste the address you are sent back to "
+              "(or just its code):", file=sys.stderr)
+        print(auth.auth_url(cid, args.redirect_uri, SCOPES), file=sys.stderr)
+        reply = input("> ").strip()
+        code = urllib.parse.parse_qs(urllib.parse.urlparse(reply).query).get("code", [reply])[0]
+        info = auth.exchange_code(code, cid, secret, args.redirect_uri)
+        rt = info.get("refresh_token")
+        if not rt:
+            sys.exit(f"no refresh token granted: {info.get('error_description') or info}")
+    save_credentials(args.credentials, {"client_id": cid, "client_secret": secret,
+                                        "refresh_token": rt})
+    print(f"saved {args.credentials}", file=sys.stderr)
+
+# Refreshes the on-disk snapshots the dashboard warm-starts from.
+def cmd_sync(args, secrets):
+    from .service import LedgerService
+    srcs = sources(args, secrets)
+    svc = LedgerService(srcs, args.snapshot_dir or secrets.get("SNAPSHOT_DIR", ".snapshots"),
+                        window_rows=args.window_rows or secrets.get("WINDOW_ROWS"),
+                        fetch_workers=secrets.get("FETCH_WORKERS"))
+    with Session(args, secrets) as tokens:
+        try:
+            combined, pending = tokens.call(svc.fetch)
+            if pending is not None:
+                combined = pending.result()
+        finally:
+            svc.close()
+    counts = combined.frame["source"].value_counts()
+    for src in srcs:
+        print(f"{src.label}: {counts.get(src.label, 0):,} rows")
+    print("totals: " + ", ".join(f"{c} {v:,.2f}" for c, v in zip(ledger.AMOUNTS, combined.totals)))
+
+def cmd_export(args, secrets):
+    from . import export
+    if args.since_last and args.out == "-":
+        sys.exit("--since-last needs --out FILE, so an export that finds an edit can start over")
+    if args.format == "parquet" and args.out == "-":
+        sys.exit("parquet cannot be written to stdout; pass --out FILE")
+    ledger.configure(window_rows=args.window_rows or secrets.get("WINDOW_ROWS"))
+    previous = read_json(args.state) if args.since_last else None
+    with Session(args, secrets) as tokens:
+        summary, state = export.export(tokens, sources(args, secrets), args.format, args.out, previous)
+    totals = args.totals or (None if args.out == "-" else args.out + ".totals.json")
+    if totals:
+        export.write_json(totals, summary)
+    export.write_json(args.state, state)
+    note = f" ({summary['reason']})" if summary["reason"] else ""
+    print(f"{summary['mode']} export: {summary['rows']:,} rows to {args.out}{note}", file=sys.stderr)
+
+
+def main(argv=None):
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--secrets", default=".streamlit/secrets.toml",
+                        help="the app's secrets file (default: %(default)s)")
+    common.add_argument("--credentials", default=CREDENTIALS,
+                        help="where login keeps the refresh token (default: %(default)s)")
+    common.add_argument("--client-id")
+    common.add_argument("--client-secret")
+    common.add_argument("--source", nargs="+", action="append",
+                        metavar=("SPREADSHEET_ID", "SHEET [LABEL]"),
+                        help="a tab to read; repeat for several (default: the secrets file's)")
+    common.add_argument("--window-rows", type=int, help="rows per request")
+
+    ap = argparse.ArgumentParser(prog="python -m finance_core",
+                                 description="The finance dashboard's ledger without the dashboard.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("login", parents=[common], help="authorize once and store a refresh token")
+    p.add_argument("--redirect-uri", default=REDIRECT_URI,
+                   help="an authorized redirect URI of the OAuth client (default: %(default)s)")
+    p.add_argument("--refresh-token", help="store this refresh token instead of signing in")
+    p.set_defaults(run=cmd_login)
+
+    p = sub.add_parser("sync", parents=[common], help="refresh the dashboard's ledger snapshots")
+    p.add_argument("--snapshot-dir", help="default: SNAPSHOT_DIR from the secrets file")
+    p.set_defaults(run=cmd_sync)
+
+    p = sub.add_parser("export", parents=[common], help="stream the ledger to a file")
+    p.add_argument("--format", choices=["csv", "jsonl", "parquet"], default="csv")
+    p.add_argument("--out", default="-", help="output file, - for stdout (default: %(default)s)")
+    p.add_argument("--totals", help="where to write the I5:K5 totals and a summary "
+                                    "(default: OUT.totals.json)")
+    p.add_argument("--since-last", action="store_true",
+                   help="only rows appended since the previous export")
+    p.add_argument("--state", default=".finance-export.json",
+                   help="where the previous export is recorded (default: %(default)s)")
+    p.set_defaults(run=cmd_export)
+
+    args = ap.parse_args(argv)
+    if any(not 2 <= len(s) <= 3 for s in args.source or []):
+        ap.error("--source takes SPREADSHEET_ID SHEET [LABEL]")
+    args.run(args, settings(args))
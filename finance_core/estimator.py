@@ -0,0 +1,20 @@
+from collections import namedtuple
+
+
+# ── Purchase estimator ────────────────────────────────────────────────────────
+# What a purchase costs with sales tax, what that leaves of the balance, and
+# both in hours of work.
+class Estimate(namedtuple("Estimate", "price tax total after hours_total shortfall hours_needed")):
+    __slots__ = ()
+
+    @property
+    def affordable(self):
+        return self.after >= 0
+
+
+def estimate(price, balance, tax_rate, hourly_rate):
+    tax   = price * tax_rate
+    total = price + tax
+    after = balance - total
+    short = max(-after, 0.0)
+    return Estimate(price, tax, total, after, total / hourly_rate, short, short / hourly_rate)
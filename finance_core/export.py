@@ -0,0 +1,182 @@
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from . import ledger, metrics, sheets
+
+FIELDS  = ["source", "row"] + ledger.COLUMNS
+FORMATS = ("csv", "jsonl", "parquet")
+
+
+# ── Streaming ledger export ───────────────────────────────────────────────────
+# The ledger the page shows, written out one row window at a time: each window
+# is parsed and handed to the writer before the next one is read (one window is
+# prefetched while the previous one is written), so memory stays at about two
+# windows whatever the size of the sheet. Every request goes through the token
+# manager, which renews the access token during long exports.
+#
+# Incremental exports resume from the state of the previous one: where each
+# source ended, the fingerprints of its last few rows and its totals. The same
+# checks as a delta sync decide whether only appended rows are new: the tail
+# rows must be unchanged, and the totals must have moved by exactly the sum of
+# the appended rows. Anything else means an earlier row was edited, and the
+# whole export is redone in full.
+class Changed(Exception):
+    pass
+
+
+# ── Writers ───────────────────────────────────────────────────────────────────
+# "-" is stdout for the text formats.
+class CsvWriter:
+    def __init__(self, path):
+        self.fh = sys.stdout if path == "-" else open(path, "w", newline="", encoding="utf-8")
+        self.fh.write(",".join(FIELDS) + "\n")
+
+    def write(self, frame):
+        frame.to_csv(self.fh, index=False, header=False, lineterminator="\n")
+
+    def close(self):
+        if self.fh is sys.stdout: self.fh.flush()
+        else: self.fh.close()
+
+class JsonlWriter(CsvWriter):
+    def __init__(self, path):
+        self.fh = sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+
+    def write(self, frame):
+        if not frame.empty:
+            self.fh.write(frame.to_json(orient="records", lines=True, force_ascii=False).rstrip("\n") + "\n")
+
+# One row group per window.
+class ParquetWriter:
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.schema = pa.schema([("source", pa.string()), ("row", pa.int64()), ("name", pa.string())]
+                                + [(c, pa.float64()) for c in ledger.AMOUNTS])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, frame):
+        if not frame.empty:
+            self.writer.write_table(self.pa.Table.from_pandas(frame, schema=self.schema,
+                                                              preserve_index=False))
+
+    def close(self):
+        self.writer.close()
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonlWriter, "parquet": ParquetWriter}
+
+
+# ── Export ────────────────────────────────────────────────────────────────────
+def key(src):
+    return f"{src.spreadsheet_id}/{src.sheet}"
+
+def write_json(path, obj):
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w") as fh:
+        json.dump(obj, fh, indent=2)
+    os.replace(tmp, path)
+
+# Rows of one window as exported: sheet row number, name and the three amounts.
+def rows(src, start, raw):
+    parsed = ledger.parse(raw)
+    return pd.DataFrame({"source": src.label,
+                         "row": start + np.flatnonzero(ledger.named(raw)),
+                         **{c: parsed[c].to_numpy() for c in ledger.COLUMNS}}, columns=FIELDS)
+
+def _source(tokens, src, writer, prev, pool):
+    sid, sheet, size = src.spreadsheet_id, src.sheet, ledger.WINDOW_ROWS
+    def window(a, b):
+        cols, = tokens.call(lambda t: sheets.batch_get(sid, [ledger.ledger_range(sheet, a, b)], t,
+                                                       **ledger.VALUE_PARAMS))
+        metrics.incr("export.windows")
+        return ledger.raw_frame(cols)
+
+    tail = np.array([int(h, 16) for h in prev["tail"]], dtype=np.uint64) if prev else \
+        np.empty(0, dtype=np.uint64)
+    next_row = prev["next_row"] if prev else ledger.FIRST_ROW
+    first, start = next_row, next_row - len(tail)
+    (tot, cols), sizes = tokens.call(lambda t: ledger.with_grid_sizes(sid, t, lambda: sheets.batch_get(
+        sid, [sheets.a1(sheet, ledger.TOTALS_RANGE), ledger.ledger_range(sheet, start, start + size - 1)],
+        t, **ledger.VALUE_PARAMS)))
+    metrics.incr("export.windows")
+    totals, raw = ledger.parse_totals(tot), ledger.raw_frame(cols)
+    if len(raw) < len(tail) or not np.array_equal(ledger.fingerprints(raw.iloc[:len(tail)]), tail):
+        raise Changed(f"{src.label}: rows before row {next_row} changed")
+
+    rest = ledger.windows(start + size, sizes[sheet])
+    out = {"rows": 0, "sums": np.zeros(3)}
+    def emit(a, raw):
+        nonlocal tail, next_row
+        if raw.empty:
+            return
+        frame = rows(src, a, raw)
+        writer.write(frame)
+        out["rows"] += len(frame)
+        out["sums"] += frame[ledger.AMOUNTS].sum().to_numpy()
+        gap = ledger.blank_fingerprints(min(a - next_row, ledger.OVERLAP))
+        tail = np.concatenate([tail, gap, ledger.fingerprints(raw)])[-ledger.OVERLAP:]
+        next_row = a + len(raw)
+
+    ahead = pool.submit(window, *rest[0]) if rest else None
+    emit(first, raw.iloc[len(tail):].reset_index(drop=True))
+    for k, (a, _) in enumerate(rest):
+        raw = ahead.result()
+        ahead = pool.submit(window, *rest[k + 1]) if k + 1 < len(rest) else None
+        emit(a, raw)
+
+    if prev:
+        moved = [round((t - p) * 100) for t, p in zip(totals, prev["totals"])]
+        if moved != [round(s * 100) for s in out["sums"]]:
+            raise Changed(f"{src.label}: totals moved by more than the appended rows")
+    metrics.incr("export.rows", out["rows"])
+    return {"label": src.label, "spreadsheet_id": sid, "sheet": sheet, "rows": out["rows"],
+            "first_row": first, "next_row": next_row,
+            "tail": [f"{int(f):016x}" for f in tail], "totals": list(totals)}
+
+def _run(tokens, sources, fmt, out, previous):
+    tmp = out if out == "-" else f"{out}.tmp{os.getpid()}"
+    pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export-prefetch")
+    writer = WRITERS[fmt](tmp)
+    try:
+        results = [_source(tokens, src, writer, previous.get(key(src)), pool) for src in sources]
+    except BaseException:
+        writer.close()
+        if tmp != out: os.remove(tmp)
+        raise
+    finally:
+        pool.shutdown(cancel_futures=True)
+    writer.close()
+    if tmp != out: os.replace(tmp, out)
+    return results
+
+# Writes the ledger of every source to out and returns (summary, state). With
+# previous (the state an earlier export returned) only rows appended since then
+# are written, unless an edit is detected; summary["mode"] says which it was.
+def export(tokens, sources, fmt, out, previous=None):
+    known = previous["sources"] if previous else {}
+    mode, reason = ("incremental" if known else "full"), None
+    with metrics.timer("export"):
+        try:
+            results = _run(tokens, sources, fmt, out, known)
+        except Changed as e:
+            metrics.incr("export.restarts")
+            mode, reason = "full", str(e)
+            results = _run(tokens, sources, fmt, out, {})
+    summary = {
+        "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "mode": mode, "reason": reason,
+        "format": fmt, "rows": sum(r["rows"] for r in results),
+        "totals": {c: float(sum(r["totals"][i] for r in results)) for i, c in enumerate(ledger.AMOUNTS)},
+        "sources": [{**{k: v for k, v in r.items() if k != "tail"},
+                     "totals": dict(zip(ledger.AMOUNTS, r["totals"]))} for r in results],
+    }
+    state = {"format": 1, "sources": {
+        key(src): {"next_row": r["next_row"], "tail": r["tail"], "totals": r["totals"]}
+        for src, r in zip(sources, results)}}
+    return summary, state
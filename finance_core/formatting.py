@@ -0,0 +1,30 @@
+# ── Display formatting ────────────────────────────────────────────────────────
+def fmt(v):
+    if v == 0: return "$0.00"
+    sign = "+" if v > 0 else "−"
+    return f"{sign}${abs(v):,.2f}"
+
+def fmt_abs(v):
+    return f"${abs(v):,.2f}"
+
+def fmt_hours(h):
+    if h < 1:    return f"{max(1,int(h*60))} min"
+    elif h < 8:
+        hh, m = int(h), int((h%1)*60)
+        return f"{hh}h {m}m" if m else f"{hh}h"
+    else:        return f"{h/8:.1f} work days"
+
+def tx_icon(v):
+    if v > 0: return "↑", "li-pos"
+    if v < 0: return "↓", "li-neg"
+    return "·", "li-mix"
+
+def tx_type(v):
+    if v > 0: return "Credit"
+    if v < 0: return "Debit"
+    return "—"
+
+def color_cls(v):
+    if v > 0: return "pos-color"
+    if v < 0: return "neg-color"
+    return "neutral-color"
@@ -0,0 +1,440 @@
+import json
+import random
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from . import metrics, sheets
+from .cache import LRUCache
+from .model import LedgerModel
+
+# ── Sheet layout ──────────────────────────────────────────────────────────────
+TOTALS_RANGE = "I5:K5"
+FIRST_ROW    = 3            # rows 1–2 are headers
+LEDGER_RANGE = f"A{FIRST_ROW}:D"
+COLUMNS      = ["name", "spending", "savings", "giving"]
+AMOUNTS      = COLUMNS[1:]
+
+# Raw numbers instead of display strings, one list per column.
+VALUE_PARAMS = {"valueRenderOption": "UNFORMATTED_VALUE", "majorDimension": "COLUMNS"}
+
+# Delta sync: how many already-known tail rows are re-read with the new rows,
+# and how many random earlier rows are spot-checked, to catch edits in place.
+OVERLAP = 5
+SAMPLES = 3
+
+# Change probe: before a delta sync, one small bounded read of the totals and
+# the last known rows (plus the row after them) tells whether a tab changed at
+# all; unchanged tabs skip the delta sync. A share of syncs still runs the full
+# delta check, so the random spot checks keep catching edits in place, and the
+# bytes those checks cost are what the probes are counted as saving.
+PROBE      = True
+PROBE_ROWS = 2
+DEEP_CHECK = 0.1
+_check_bytes = {}   # (spreadsheet, tab) -> bytes of its last delta check that found no change
+
+# Full loads read the ledger in fixed-size row windows, fetched concurrently.
+# Sources living in different spreadsheets are synced in parallel on a
+# separate pool, so a source task never waits on a window slot it holds.
+WINDOW_ROWS    = 2000
+FETCH_WORKERS  = 4
+SOURCE_WORKERS = 4
+
+_pools     = {}
+_pool_lock = threading.Lock()
+
+Source = sheets.Source
+
+
+def configure(window_rows=None, fetch_workers=None, probe=None):
+    global WINDOW_ROWS, FETCH_WORKERS, PROBE
+    if probe is not None:
+        PROBE = bool(probe)
+    window_rows   = int(window_rows or WINDOW_ROWS)
+    fetch_workers = int(fetch_workers or FETCH_WORKERS)
+    if (window_rows, fetch_workers) == (WINDOW_ROWS, FETCH_WORKERS):
+        return
+    WINDOW_ROWS, FETCH_WORKERS = window_rows, fetch_workers
+    with _pool_lock:
+        pool = _pools.pop("window", None)
+    if pool is not None: pool.shutdown(wait=False)
+
+def _executor(kind):
+    with _pool_lock:
+        if kind not in _pools:
+            workers = FETCH_WORKERS if kind == "window" else SOURCE_WORKERS
+            _pools[kind] = ThreadPoolExecutor(max_workers=workers,
+                                              thread_name_prefix=f"ledger-{kind}")
+        return _pools[kind]
+
+
+# ── Parsing ───────────────────────────────────────────────────────────────────
+# Columns arrive as ragged lists (the API trims trailing blanks per column);
+# pad them into one object frame with a row per sheet row.
+def raw_frame(columns, nrows=None):
+    n = max((len(c) for c in columns), default=0) if nrows is None else nrows
+    data = {}
+    for i, name in enumerate(COLUMNS):
+        col = list(columns[i][:n]) if i < len(columns) else []
+        data[name] = np.array(col + [""] * (n - len(col)), dtype=object)
+    return pd.DataFrame(data, dtype=object, copy=False)
+
+# Fallback for cells that still hold display text: "$1,234.50", "(1,234.00)",
+# "−12" (unicode minus). Anything unparseable is 0, like the sheet's blanks.
+# Done with plain Arrow substring replaces: pandas' string methods and regex
+# replaces cost more than the work itself on a typical window.
+_STRIP = [("−", "-")] + [(c, "") for c in "$,()€£ \xa0\u202f"]
+
+def parse_formatted(values):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    try:
+        t = pa.array(values, type=pa.string())
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        t = pa.array([str(x) for x in values], type=pa.string())
+    t = pc.utf8_trim_whitespace(t)
+    paren = pc.fill_null(pc.and_(pc.starts_with(t, "("), pc.ends_with(t, ")")), False)
+    try:
+        joined = "".join(values)
+    except TypeError:
+        joined = None
+    for old, new in _STRIP:
+        if joined is None or old in joined:
+            t = pc.replace_substring(t, old, new)
+    try:
+        v = pc.cast(t, pa.float64()).to_numpy(zero_copy_only=False)
+    except pa.ArrowInvalid:
+        v = pd.to_numeric(pd.Series(t.to_pylist(), dtype=object), errors="coerce").to_numpy()
+    v = np.nan_to_num(v, nan=0.0, posinf=np.inf, neginf=-np.inf)
+    return np.where(paren.to_numpy(zero_copy_only=False), -np.abs(v), v)
+
+# Cells -> float64 array. Blank cells ("" or missing) are 0. Numbers, and
+# numeric text, convert in one cast; only when that fails are the text cells
+# parsed as display text.
+def to_amounts(values):
+    a = np.asarray(values, dtype=object)
+    out = np.zeros(len(a))
+    filled = a != ""
+    vals = a[filled]
+    try:
+        v = vals.astype(np.float64)
+    except (TypeError, ValueError):
+        text = np.ones(len(vals), dtype=bool) if pd.api.types.infer_dtype(vals) == "string" else \
+            np.fromiter((type(x) is str for x in vals), dtype=bool, count=len(vals))
+        v = np.zeros(len(vals))
+        v[~text] = pd.to_numeric(pd.Series(vals[~text], dtype=object), errors="coerce")
+        v[text] = parse_formatted(vals[text])
+    out[filled] = v
+    out[np.isnan(out)] = 0.0
+    return out
+
+def parse_totals(grid):
+    vals = [c[0] if c else 0 for c in grid[:3]]
+    vals += [0] * (3 - len(vals))
+    return tuple(float(v) for v in to_amounts(vals))
+
+# Rows that count as ledger entries (a bool array): the ones with a name.
+def named(raw):
+    names = raw["name"].to_numpy(dtype=object)
+    return (names != "") & ~pd.isna(names)
+
+# Chronological (sheet order) frame; rows without a name are skipped.
+def parse(raw):
+    with metrics.timer("ledger.parse"):
+        keep = named(raw)
+        names = raw["name"].to_numpy(dtype=object)[keep]
+        if pd.api.types.infer_dtype(names, skipna=False) not in ("string", "empty"):
+            names = np.array([str(x) for x in names], dtype=object)
+        out = {"name": names}
+        for col in AMOUNTS:
+            out[col] = to_amounts(raw[col].to_numpy(dtype=object)[keep])
+        return pd.DataFrame(out, columns=COLUMNS)
+
+def fingerprints(raw):
+    if raw.empty:
+        return np.empty(0, dtype=np.uint64)
+    return pd.util.hash_pandas_object(raw.fillna("").astype(str), index=False).to_numpy()
+
+def blank_fingerprints(n):
+    return np.repeat(fingerprints(raw_frame([], nrows=1)), n)
+
+
+# ── State ─────────────────────────────────────────────────────────────────────
+# The last parsed ledger (newest first, as the page shows it) plus one
+# fingerprint per raw sheet row, blank rows included, so the next sync knows
+# exactly where the tail is.
+class LedgerState:
+    def __init__(self, frame, totals, fingerprints, rows_crc):
+        self.frame        = frame
+        self.totals       = totals
+        self.fingerprints = fingerprints
+        self.rows_crc     = rows_crc
+        self.version      = f"{len(fingerprints)}-{zlib.crc32(repr(totals).encode(), rows_crc):08x}"
+
+    @property
+    def row_count(self):
+        return len(self.fingerprints)
+
+    @property
+    def nbytes(self):
+        return int(self.frame.memory_usage(deep=True).sum()) + self.fingerprints.nbytes
+
+    def extend(self, raw, totals):
+        return self.append(parse(raw), fingerprints(raw), totals)
+
+    def append(self, parsed, new_fps, totals):
+        fps = np.concatenate([self.fingerprints, new_fps])
+        crc = zlib.crc32(new_fps.tobytes(), self.rows_crc)
+        new = parsed.iloc[::-1]
+        if new.empty:
+            frame = self.frame
+        elif self.frame.empty:
+            frame = new.reset_index(drop=True)
+        else:
+            frame = pd.concat([new, self.frame], ignore_index=True)
+        return LedgerState(frame, totals, fps, crc)
+
+EMPTY = LedgerState(pd.DataFrame(columns=COLUMNS), (0.0, 0.0, 0.0),
+                    np.empty(0, dtype=np.uint64), 0)
+
+
+# ── Sync ──────────────────────────────────────────────────────────────────────
+def ledger_range(sheet, start, stop=None):
+    return sheets.a1(sheet, f"A{start}:D{stop or ''}")
+
+# Sheet rows start..last in windows of WINDOW_ROWS, as (first, last) pairs.
+def windows(start, last):
+    return [(a, min(a + WINDOW_ROWS - 1, last)) for a in range(start, last + 1, WINDOW_ROWS)]
+
+# The API trims trailing blank rows from a range, so a short window does not
+# mean the ledger ended there: only the tab's grid size bounds it. read() is
+# the first request of a windowed read; the grid sizes of the spreadsheet's
+# tabs are fetched alongside it. Returns (read(), {tab: grid rows}).
+def with_grid_sizes(spreadsheet_id, access_token, read):
+    sizes = _executor("window").submit(sheets.grid_sizes, spreadsheet_id, access_token)
+    out = read()
+    return out, sizes.result()
+
+# Each window is parsed as soon as it arrives, on the worker that fetched it.
+def _fetch_window(spreadsheet_id, sheet, access_token, a, b):
+    cols, = sheets.batch_get(spreadsheet_id, [ledger_range(sheet, a, b)],
+                             access_token, **VALUE_PARAMS)
+    raw = raw_frame(cols)
+    return parse(raw), fingerprints(raw)
+
+# The first window rides along with the totals, so ledgers shorter than one
+# window still cost a single round trip (plus the grid sizes, in parallel).
+# The tab's grid size bounds the remaining windows, which are fetched through
+# the bounded pool and reassembled in sheet order. Blank padding keeps the
+# fingerprints identical to a single open-ended range read.
+def full_sync(spreadsheet_id, sheet, access_token):
+    grids, sizes = with_grid_sizes(spreadsheet_id, access_token, lambda: sheets.batch_get(
+        spreadsheet_id, _full_ranges(sheet), access_token, **VALUE_PARAMS))
+    return _finish_full(spreadsheet_id, sheet, access_token, grids, sizes[sheet])
+
+def _full_ranges(sheet):
+    return [sheets.a1(sheet, TOTALS_RANGE), ledger_range(sheet, FIRST_ROW, FIRST_ROW + WINDOW_ROWS - 1)]
+
+def _finish_full(spreadsheet_id, sheet, access_token, grids, last):
+    tot, cols = grids
+    raw = raw_frame(cols)
+    parts = [(parse(raw), fingerprints(raw))]
+    rest = windows(FIRST_ROW, last)[1:]
+    if rest:
+        futures = {_executor("window").submit(_fetch_window, spreadsheet_id, sheet, access_token, a, b): k
+                   for k, (a, b) in enumerate(rest)}
+        done = {}
+        for fut in as_completed(futures):
+            done[futures[fut]] = fut.result()
+        parts += [done[k] for k in range(len(rest))]
+        metrics.incr("ledger.windows_fetched", len(rest))
+        while len(parts) > 1 and not len(parts[-1][1]):
+            parts.pop()
+        for i in range(len(parts) - 1):
+            parsed, fps = parts[i]
+            if len(fps) < WINDOW_ROWS:
+                parts[i] = parsed, np.concatenate([fps, blank_fingerprints(WINDOW_ROWS - len(fps))])
+
+    parsed = pd.concat([p for p, _ in parts], ignore_index=True) if len(parts) > 1 else parts[0][0]
+    fps = np.concatenate([f for _, f in parts])
+    metrics.incr("ledger.full_syncs")
+    metrics.incr("ledger.rows_fetched", len(fps))
+    return EMPTY.append(parsed, fps, parse_totals(tot))
+
+# Delta sync: fetch only rows past the known tail, together with a few
+# overlapping tail rows and a random sample of earlier rows. Any fingerprint
+# mismatch, a shrunken sheet, or totals that did not move by exactly the sum of
+# the appended rows (to the cent) means an earlier row was edited and the
+# ledger is reloaded in full.
+def _delta_ranges(sheet, state):
+    start = max(0, state.row_count - OVERLAP)
+    sample = sorted(random.sample(range(start), min(SAMPLES, start)))
+    ranges = [sheets.a1(sheet, TOTALS_RANGE), ledger_range(sheet, FIRST_ROW + start)]
+    ranges += [ledger_range(sheet, FIRST_ROW + i, FIRST_ROW + i) for i in sample]
+    return ranges, start, sample
+
+def _finish_delta(spreadsheet_id, sheet, access_token, state, start, sample, grids):
+    totals = parse_totals(grids[0])
+    tail = raw_frame(grids[1])
+    probes = [fingerprints(raw_frame(g, nrows=1))[0] for g in grids[2:]]
+
+    fps, known = state.fingerprints, state.row_count - start
+    new = tail.iloc[known:]
+    moved = [round((t - p) * 100) for t, p in zip(totals, state.totals)]
+    added = [round(to_amounts(new[c].to_numpy(dtype=object)).sum() * 100) for c in AMOUNTS]
+    if (len(tail) < known
+            or not np.array_equal(fingerprints(tail.iloc[:known]), fps[start:start + known])
+            or not np.array_equal(np.asarray(probes, dtype=np.uint64), fps[sample])
+            or moved != added):
+        metrics.incr("ledger.edits_detected")
+        return full_sync(spreadsheet_id, sheet, access_token)
+
+    metrics.incr("ledger.delta_syncs")
+    metrics.incr("ledger.rows_fetched", len(new))
+    if new.empty and totals == state.totals:
+        _check_bytes[(spreadsheet_id, sheet)] = _nbytes(grids)
+        return state
+    return state.extend(new, totals)
+
+# Response size of some grids, close to what they cost on the wire.
+def _nbytes(grids):
+    return sum(len(json.dumps(g, separators=(",", ":"))) for g in grids)
+
+def _probe_ranges(sheet, state):
+    start = max(0, state.row_count - PROBE_ROWS)
+    return [sheets.a1(sheet, TOTALS_RANGE),
+            ledger_range(sheet, FIRST_ROW + start, FIRST_ROW + state.row_count)]
+
+def _unchanged(state, grids):
+    start = max(0, state.row_count - PROBE_ROWS)
+    fps = fingerprints(raw_frame(grids[1], nrows=state.row_count + 1 - start))
+    return (parse_totals(grids[0]) == state.totals
+            and np.array_equal(fps[:-1], state.fingerprints[start:])
+            and fps[-1] == blank_fingerprints(1)[0])
+
+# items[i] for i in probed -> that state if the tab is unchanged, else None.
+def _probe(spreadsheet_id, access_token, items, probed):
+    grids = sheets.batch_get(spreadsheet_id, [r for i in probed for r in _probe_ranges(*items[i])],
+                             access_token, **VALUE_PARAMS)
+    out = {}
+    for j, i in enumerate(probed):
+        sheet, state = items[i]
+        g = grids[2 * j:2 * j + 2]
+        size = _nbytes(g)
+        metrics.incr("ledger.probes")
+        metrics.incr("ledger.probe_bytes", size)
+        if _unchanged(state, g):
+            out[i] = state
+            metrics.incr("ledger.probe_skips")
+            saved = _check_bytes.get((spreadsheet_id, sheet), 0) - size
+            if saved > 0: metrics.incr("ledger.probe_saved_bytes", saved)
+        else:
+            metrics.incr("ledger.probe_misses")
+    return out
+
+# Syncs several tabs of one spreadsheet with a single batchGet: every tab's
+# delta (or first full window) ranges are concatenated into one request. Tabs
+# with a known state are probed first, all in one request as well.
+def sync_many(spreadsheet_id, access_token, items):
+    metrics.incr("sheets.syncs")
+    probed = [i for i, (_, state) in enumerate(items)
+              if PROBE and state is not None and state.row_count and random.random() >= DEEP_CHECK]
+    done = _probe(spreadsheet_id, access_token, items, probed) if probed else {}
+    plans, full = {}, False
+    for i, (sheet, state) in enumerate(items):
+        if i in done:
+            continue
+        if state is None or not state.row_count:
+            full = True
+            plans[i] = (_full_ranges(sheet), lambda g, sizes, sheet=sheet:
+                        _finish_full(spreadsheet_id, sheet, access_token, g, sizes[sheet]))
+        else:
+            ranges, start, sample = _delta_ranges(sheet, state)
+            plans[i] = (ranges, lambda g, sizes, sheet=sheet, state=state, start=start, sample=sample:
+                        _finish_delta(spreadsheet_id, sheet, access_token, state, start, sample, g))
+    if plans:
+        read = lambda: sheets.batch_get(spreadsheet_id, [r for ranges, _ in plans.values() for r in ranges],
+                                        access_token, **VALUE_PARAMS)
+        grids, sizes = with_grid_sizes(spreadsheet_id, access_token, read) if full else (read(), None)
+        k = 0
+        for i, (ranges, finish) in plans.items():
+            done[i] = finish(grids[k:k + len(ranges)], sizes)
+            k += len(ranges)
+    return [done[i] for i in range(len(items))]
+
+def sync(spreadsheet_id, sheet, access_token, state=None):
+    return sync_many(spreadsheet_id, access_token, [(sheet, state)])[0]
+
+# items: [(Source, base state or None)] -> synced states in the same order.
+# One batched request per spreadsheet, spreadsheets in parallel.
+def sync_sources(access_token, items):
+    groups = {}
+    for i, (src, base) in enumerate(items):
+        groups.setdefault(src.spreadsheet_id, []).append((i, src.sheet, base))
+
+    def run(spreadsheet_id, group):
+        states = sync_many(spreadsheet_id, access_token, [(sh, b) for _, sh, b in group])
+        return [(i, st) for (i, _, _), st in zip(group, states)]
+
+    if len(groups) == 1:
+        results = run(*next(iter(groups.items())))
+    else:
+        futures = [_executor("source").submit(run, sid, g) for sid, g in groups.items()]
+        results = [r for fut in futures for r in fut.result()]
+    out = [None] * len(items)
+    for i, st in results:
+        out[i] = st
+    return out
+
+
+# ── Combined ledger ───────────────────────────────────────────────────────────
+# Several sources merged into the one ledger the page shows, newest first.
+# Sources are listed oldest first (e.g. one tab per year), so later sources'
+# rows come first; totals are summed across sources.
+class Combined:
+    def __init__(self, states, labels):
+        self._states = list(zip(states, labels))
+        self.totals  = tuple(float(sum(st.totals[i] for st in states)) for i in range(3))
+        self.sources = list(labels)
+        self.version = f"{zlib.crc32(' '.join(st.version for st in states).encode()):08x}"
+        self._model  = None
+        self._lock   = threading.Lock()
+
+    # The combined frame, built on demand: once the model exists nothing
+    # keeps a second copy of every sheet's rows around.
+    @property
+    def frame(self):
+        frames = [st.frame.assign(source=label)
+                  for st, label in reversed(self._states) if not st.frame.empty]
+        frame = pd.concat(frames, ignore_index=True) if frames else \
+            pd.DataFrame(columns=COLUMNS + ["source"])
+        frame["source"] = pd.Categorical(frame["source"], categories=list(dict.fromkeys(self.sources)))
+        return frame
+
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                self._model = LedgerModel(self.frame, self.totals, self.version)
+                metrics.gauge("ledger.frame_bytes", self._model.frame_bytes)
+                metrics.gauge("ledger.model_bytes", self._model.nbytes)
+            return self._model
+
+    # The sheets' own frames are counted where they are cached.
+    @property
+    def nbytes(self):
+        return self._model.nbytes if self._model is not None else 0
+
+_combined = LRUCache(max_entries=16, name="combined_cache")
+
+# scope (e.g. the user) keeps identical-looking versions of different
+# people's ledgers apart.
+def combine(states, labels, scope=None):
+    key = (scope, tuple(st.version for st in states), tuple(labels))
+    out = _combined.get(key)
+    if out is None:
+        out = Combined(states, labels)
+        _combined.put(key, out)
+    return out
@@ -0,0 +1,109 @@
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# ── Process-wide counters ─────────────────────────────────────────────────────
+# Module state survives Streamlit reruns, so these accumulate per server process.
+_lock     = threading.Lock()
+_counters = defaultdict(float)
+_gauges   = {}
+_timings  = {}      # name -> [count, total_ms, max_ms, last_ms]
+_local    = threading.local()
+
+TRACE_LIMIT = 500   # spans kept per trace
+
+
+def incr(name, n=1):
+    with _lock:
+        _counters[name] += n
+
+def gauge(name, value):
+    with _lock:
+        _gauges[name] = value
+
+def observe(name, ms):
+    with _lock:
+        t = _timings.setdefault(name, [0, 0.0, 0.0, 0.0])
+        t[0] += 1
+        t[1] += ms
+        t[2] = max(t[2], ms)
+        t[3] = ms
+
+# A timer is also a span: while a trace is open on this thread, each one is
+# recorded as [name, depth, start_ms, ms] in the order it started.
+@contextmanager
+def timer(name):
+    t0 = time.perf_counter()
+    trace = getattr(_local, "trace", None)
+    span = None
+    if trace is not None and len(trace[0]) < TRACE_LIMIT:
+        span = [name, _local.depth, round((t0 - trace[1]) * 1000, 3), None]
+        trace[0].append(span)
+    _local.depth = getattr(_local, "depth", 0) + 1
+    try:
+        yield
+    finally:
+        _local.depth -= 1
+        ms = (time.perf_counter() - t0) * 1000
+        observe(name, ms)
+        if span is not None:
+            span[3] = round(ms, 3)
+
+# ── Per-run traces ────────────────────────────────────────────────────────────
+# One script run opens a trace on its thread and closes it at the end; timers
+# on worker threads still count towards the process timings, just not the trace.
+def start_trace():
+    spans = []
+    _local.trace = (spans, time.perf_counter())
+    _local.depth = 0
+    return spans
+
+def end_trace():
+    _local.trace = None
+
+def get(name, default=0):
+    with _lock:
+        if name in _gauges: return _gauges[name]
+        return _counters.get(name, default)
+
+def snapshot():
+    with _lock:
+        out = dict(_counters)
+        out.update(_gauges)
+        for name, (n, total, worst, last) in _timings.items():
+            out[f"{name}.count"]   = n
+            out[f"{name}.avg_ms"]  = total / n
+            out[f"{name}.max_ms"]  = worst
+            out[f"{name}.last_ms"] = last
+    syncs = out.get("sheets.syncs", 0)
+    if syncs:
+        out["sheets.round_trips_per_sync"] = out.get("sheets.round_trips", 0) / syncs
+    return out
+
+# Prometheus text exposition: counters, gauges, and timings as summaries.
+def prometheus(prefix="finance"):
+    def name(n):
+        return prefix + "_" + re.sub(r"[^a-zA-Z0-9_]", "_", n)
+    with _lock:
+        counters, gauges = dict(_counters), dict(_gauges)
+        timings = {k: list(v) for k, v in _timings.items()}
+    lines = []
+    for k, v in sorted(counters.items()):
+        n = name(k) + "_total"
+        lines += [f"# TYPE {n} counter", f"{n} {v:g}"]
+    for k, v in sorted(gauges.items()):
+        if isinstance(v, (int, float)):
+            lines += [f"# TYPE {name(k)} gauge", f"{name(k)} {v:g}"]
+    for k, (count, total, worst, _) in sorted(timings.items()):
+        n = name(k) + "_ms"
+        lines += [f"# TYPE {n} summary", f"{n}_sum {total:g}", f"{n}_count {count}",
+                  f"# TYPE {n}_max gauge", f"{n}_max {worst:g}"]
+    return "\n".join(lines) + "\n"
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _timings.clear()
@@ -0,0 +1,107 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .search import SearchIndex
+from .series import downsample
+
+ACCOUNTS = ("spending", "savings", "giving")
+
+
+def _names(column):
+    names = pa.array(column.astype(str).to_numpy(dtype=object), type=pa.string())
+    if pc.count_distinct(names).as_py() * 2 <= len(names):
+        return names.dictionary_encode()
+    return names
+
+# int32 cents when every amount fits (sums and running balances still widen).
+def _narrow(cents):
+    info = np.iinfo(np.int32)
+    if not len(cents) or (cents.min() >= info.min and cents.max() <= info.max):
+        return cents.astype(np.int32)
+    return cents
+
+
+# ── Compact ledger model ──────────────────────────────────────────────────────
+# Built once per data version from the combined ledger frame (newest first).
+# Amounts are exact integer cents, sources are categorical codes, and each
+# account's view is an index array into the shared columns rather than a copy.
+# Names are one Arrow string array, dictionary-encoded only when names repeat
+# enough for the codes and the distinct names to cost less than the names.
+class LedgerModel:
+    def __init__(self, frame, sheet_totals, version):
+        self.version = version
+        self.names   = _names(frame["name"])
+        self.sources = pd.Categorical(frame["source"]) if "source" in frame else None
+        self.cents   = {a: _narrow(np.rint(frame[a].to_numpy(dtype="float64") * 100).astype(np.int64))
+                        for a in ACCOUNTS}
+        self.rows    = {a: np.flatnonzero(self.cents[a]).astype(np.int32) for a in ACCOUNTS}
+        self.totals_cents = {a: int(self.cents[a].sum()) for a in ACCOUNTS}
+        self.sheet_cents  = {a: int(round(t * 100)) for a, t in zip(ACCOUNTS, sheet_totals)}
+        self.frame_bytes  = int(frame.memory_usage(deep=True).sum())
+        self._index = None
+        self._series = {}
+        self._lock  = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def nbytes(self):
+        n = self.names.nbytes
+        if self.sources is not None:
+            n += self.sources.codes.nbytes
+        n += sum(c.nbytes for c in self.cents.values())
+        n += sum(r.nbytes for r in self.rows.values())
+        return n
+
+    def view(self, account):
+        return self.rows[account]
+
+    def total(self, account):
+        return self.totals_cents[account] / 100
+
+    # Accounts whose ledger sum disagrees with the sheet's summary cell:
+    # {account: (ledger dollars, sheet dollars)}.
+    def mismatches(self):
+        return {a: (self.totals_cents[a] / 100, self.sheet_cents[a] / 100)
+                for a in ACCOUNTS if self.totals_cents[a] != self.sheet_cents[a]}
+
+    def names_at(self, idx):
+        return pc.take(self.names, idx).to_numpy(zero_copy_only=False)
+
+    def sources_at(self, idx):
+        return np.asarray(self.sources.categories, dtype=object)[self.sources.codes[idx]]
+
+    def index(self):
+        with self._lock:
+            if self._index is None:
+                self._index = SearchIndex(self)
+            return self._index
+
+    # Case-insensitive substring terms (all must match) plus amount
+    # filters such as ">100" or "<-20", over one account's view.
+    def search(self, account, query):
+        if not query or not query.strip():
+            return self.rows[account]
+        return self.index().query(account, query)
+
+    # Running balance in dollars, oldest first.
+    def history(self, account):
+        return np.cumsum(self.cents[account][self.rows[account][::-1]]) / 100
+
+    # The running balance as (x, y), reduced to `points` points (None = every
+    # point). Computed once per account and resolution for this version.
+    def history_points(self, account, points=None):
+        key = (account, points)
+        with self._lock:
+            out = self._series.get(key)
+        if out is None:
+            y = self.history(account)
+            out = (np.arange(len(y)), y) if points is None else downsample(y, points)
+            with self._lock:
+                self._series[key] = out
+        return out
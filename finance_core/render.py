@@ -0,0 +1,114 @@
+import html
+import threading
+
+from .cache import LRUCache
+from .formatting import color_cls, fmt, fmt_abs, fmt_hours, tx_icon, tx_type
+
+_ROW = """
+        <div class="ledger-row">
+            <div class="l-icon {icls}">{icon}</div>
+            <div class="l-info">
+                <div class="l-name">{name}</div>
+                <div class="l-type">{kind}{src}</div>
+            </div>
+            <div class="l-amt {ccls}">{amt}</div>
+        </div>"""
+
+
+# ── Ledger rows ───────────────────────────────────────────────────────────────
+# One page of rows, built in a single join; names and source labels are
+# escaped since they come straight from the sheet.
+def ledger_html(names, cents, sources=None):
+    rows = []
+    for i, (name, c) in enumerate(zip(names, cents)):
+        v = int(c) / 100
+        icon, icls = tx_icon(v)
+        rows.append(_ROW.format(
+            icls=icls, icon=icon, name=html.escape(str(name)), kind=tx_type(v),
+            src=" · " + html.escape(str(sources[i])) if sources is not None else "",
+            ccls=color_cls(v), amt=fmt(v)))
+    return f'<div class="ledger">{"".join(rows)}</div>'
+
+
+# ── Hero card ─────────────────────────────────────────────────────────────────
+# mismatch is (ledger $, sheet $) when the summary cell disagrees with the rows.
+def hero_html(label, color, sub, total, mismatch=None, cell=""):
+    warn = ""
+    if mismatch is not None:
+        ledger_v, sheet_v = mismatch
+        warn = f"""
+    <div class="reconcile-warn">
+        Sheet total in {cell} shows {fmt_abs(sheet_v)}; the ledger rows add up to
+        {fmt_abs(ledger_v)} ({fmt(ledger_v - sheet_v)}).
+    </div>"""
+    return f"""
+    <div class="hero-balance">
+        <div class="hero-label">{label}</div>
+        <div class="hero-amount {color}">{fmt_abs(total)}</div>
+        <div class="hero-sub">{sub}</div>
+    </div>{warn}"""
+
+
+# ── Purchase estimator breakdown ──────────────────────────────────────────────
+def estimate_html(est, tax_rate, hourly_rate):
+    out = f"""
+    <div class="breakdown-rows">
+        <div class="brow">
+            <span>Sticker price</span>
+            <span class="bval">{fmt_abs(est.price)}</span>
+        </div>
+        <div class="brow">
+            <span>Sales tax <small style='color:#282828'>{tax_rate * 100:g}%</small></span>
+            <span class="bval">+ {fmt_abs(est.tax)}</span>
+        </div>
+        <div class="brow total-row">
+            <span class="blab">Total cost</span>
+            <span class="bval">{fmt_abs(est.total)}</span>
+        </div>
+    </div>"""
+
+    if est.affordable:
+        return out + f"""
+    <div class="verdict yes">
+        <div class="v-eye">Remaining balance</div>
+        <div class="v-num">{fmt_abs(est.after)}</div>
+        <div class="v-desc">You can afford this purchase</div>
+        <div class="work-badge">⏱&nbsp; costs <strong>{fmt_hours(est.hours_total)}</strong> of work @ ${hourly_rate:.0f}/hr</div>
+    </div>"""
+    return out + f"""
+    <div class="verdict no">
+        <div class="v-eye">Shortfall</div>
+        <div class="v-num">{fmt_abs(est.shortfall)}</div>
+        <div class="v-desc">You need {fmt_abs(est.shortfall)} more to afford this</div>
+        <div class="work-badge">⏱&nbsp; need <strong>{fmt_hours(est.hours_needed)}</strong> more work @ ${hourly_rate:.0f}/hr</div>
+    </div>
+    <p style='text-align:center;font-size:11px;color:#242424;margin-top:10px;letter-spacing:0.3px'>
+        Full cost = <strong style='color:#323232'>{fmt_hours(est.hours_total)}</strong> of work
+    </p>"""
+
+
+# ── Rendered-fragment cache ───────────────────────────────────────────────────
+# Bounded LRU of finished fragments keyed on (scope, version, *key). When a
+# scope (one user's ledger) shows up with a new data version, everything built
+# from the old version is dropped straight away instead of aging out.
+class FragmentCache:
+    def __init__(self, max_entries=256, max_bytes=16 << 20):
+        self._lru      = LRUCache(max_entries=max_entries, max_bytes=max_bytes,
+                                  name="render_cache")
+        self._versions = {}
+        self._lock     = threading.Lock()
+
+    def get(self, scope, version, key, build):
+        with self._lock:
+            if self._versions.get(scope) != version:
+                self._versions[scope] = version
+                self._lru.discard(lambda k: k[0] == scope)
+        full = (scope, version) + tuple(key)
+        out = self._lru.get(full)
+        if out is None:
+            out = build()
+            self._lru.put(full, out)
+        return out
+
+    def stats(self):
+        return self._lru.stats()
@@ -0,0 +1,68 @@
+import re
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+_AMOUNT = re.compile(r"^(>=|<=|>|<|=)(-?)\$?(\d[\d,]*(?:\.\d+)?|\.\d+)$")
+_OPS    = {">": np.greater, "<": np.less, ">=": np.greater_equal,
+           "<=": np.less_equal, "=": np.equal}
+
+
+def normalize(text):
+    return " ".join(str(text).lower().split())
+
+# "coffee >5 <=-20" -> (["coffee"], [(">", 500), ("<=", -2000)])
+def parse_query(query):
+    terms, filters = [], []
+    for part in normalize(query).split(" "):
+        if not part: continue
+        m = _AMOUNT.match(part)
+        if m:
+            op, neg, num = m.groups()
+            cents = int(round(float(num.replace(",", "")) * 100))
+            filters.append((op, -cents if neg else cents))
+        else:
+            terms.append(part)
+    return terms, filters
+
+
+# ── Search index ──────────────────────────────────────────────────────────────
+# Built once per data version. Each account keeps the names in its view
+# (normalized, as one Arrow array): the distinct ones plus, per view row, which
+# of those it holds when names are dictionary-encoded, or one per row when they
+# are not. A term is one vectorized substring match over those names, and rows
+# are picked with a single lookup through that mask.
+class SearchIndex:
+    def __init__(self, model):
+        names = model.names
+        codes = None
+        if pa.types.is_dictionary(names.type):
+            names, codes = names.dictionary, names.indices.to_numpy()
+        lower = pc.binary_join(pc.utf8_split_whitespace(pc.utf8_lower(names)), " ")
+
+        self.views = {}
+        for account, rows in model.rows.items():
+            if codes is None:
+                names, local = pc.take(lower, rows), None
+            else:
+                used, local = np.unique(codes[rows], return_inverse=True)
+                names, local = pc.take(lower, used), local.astype(np.int32)
+            self.views[account] = (rows, names, local, model.cents[account][rows])
+
+    # Row indices (newest first) in the account's view matching every term
+    # and every amount filter.
+    def query(self, account, query):
+        rows, names, local, cents = self.views[account]
+        terms, filters = parse_query(query)
+        if terms:
+            hit = pc.match_substring(names, terms[0])
+            for term in terms[1:]:
+                hit = pc.and_(hit, pc.match_substring(names, term))
+            hit = hit.to_numpy(zero_copy_only=False)
+            pos = np.flatnonzero(hit if local is None else hit[local])
+        else:
+            pos = np.arange(len(rows))
+        for op, value in filters:
+            pos = pos[_OPS[op](cents[pos], value)]
+        return rows[pos]
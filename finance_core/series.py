@@ -0,0 +1,35 @@
+import numpy as np
+
+
+# ── Downsampling ──────────────────────────────────────────────────────────────
+# Largest-Triangle-Three-Buckets: keeps the first and last point and, from each
+# bucket in between, the point forming the largest triangle with the previous
+# pick and the next bucket's mean. Peaks and troughs survive; flat runs don't
+# cost points. Returns the indices of the kept points.
+def lttb(y, points):
+    n = len(y)
+    if points >= n or points < 3:
+        return np.arange(n)
+    y = np.asarray(y, dtype="float64")
+    x = np.arange(n, dtype="float64")
+    every = (n - 2) / (points - 2)
+    keep = np.empty(points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo = int(i * every) + 1
+        hi = int((i + 1) * every) + 1
+        nhi = min(int((i + 2) * every) + 1, n)
+        if hi < nhi:
+            avg_x, avg_y = x[hi:nhi].mean(), y[hi:nhi].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+# (x, y) of a series reduced to at most `points` points; x are original positions.
+def downsample(y, points):
+    keep = lttb(y, points)
+    return keep, np.asarray(y)[keep]
@@ -0,0 +1,239 @@
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+
+from . import auth, ledger, metrics, snapshot
+from .cache import LRUCache
+
+
+# ── Background poller ─────────────────────────────────────────────────────────
+# One per user and spreadsheet, shared by all of that user's sessions. It
+# delta-syncs the user's tabs of the spreadsheet into the service's cache on an
+# adaptive interval: back to min_interval after a change, doubling while the
+# sheet stays the same, never slower than max_interval. It uses the newest
+# access token a session handed it and stops once no session has asked for the
+# ledger for `idle` seconds, or once its service is gone. kick() asks for a
+# poll now and returns a future for it; kicks that arrive before the poll starts
+# share it.
+class Poller:
+    def __init__(self, service, user, sources, access_token, min_interval, max_interval, idle):
+        self.service      = weakref.ref(service)
+        self.user         = user
+        self.sources      = sources
+        self.token        = access_token
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.idle         = idle
+        self.interval     = min_interval
+        self.seen         = time.time()
+        self.alive        = True
+        self._next   = Future()
+        self._wake   = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name=f"ledger-poll-{sources[0].spreadsheet_id[:8]}")
+        self._thread.start()
+
+    def touch(self, access_token):
+        self.token, self.seen = access_token, time.time()
+
+    def kick(self, fast=False):
+        fut = self._next
+        if fast: self.interval = self.min_interval
+        self._wake.set()
+        return fut
+
+    def stop(self):
+        self.alive = False
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            service = self.service()
+            if service is None or not service._keep(self):
+                break
+            fut, self._next = self._next, Future()
+            try:
+                changed = self._poll(service)
+            except Exception as e:
+                metrics.incr("poller.errors")
+                self.interval = min(self.interval * 2, self.max_interval)
+                fut.set_exception(e)
+            else:
+                self.interval = self.min_interval if changed else \
+                    min(self.interval * 2, self.max_interval)
+                fut.set_result(changed)
+            del service
+        self._next.set_exception(RuntimeError("poller stopped"))
+
+    def _poll(self, service):
+        token = self.token
+        if token is None:
+            raise auth.AuthError("Waiting for a session with a valid access token.")
+        bases = {}
+        for src in self.sources:
+            hit = service.cache.peek(service.key(self.user, src))
+            bases[src] = hit[0] if hit else None
+        try:
+            states = service.refresh(self.user, token, bases)
+        except (auth.AuthError, requests.HTTPError) as e:
+            # A rejected token waits for the next one a session brings along.
+            if isinstance(e, auth.AuthError) or getattr(e.response, "status_code", None) == 401:
+                if self.token == token: self.token = None
+            raise
+        metrics.incr("poller.polls")
+        changed = any(states[src] is not bases[src] for src in self.sources)
+        if changed: metrics.incr("poller.changes")
+        return changed
+
+
+# ── Ledger service ────────────────────────────────────────────────────────────
+# Everything between an access token and the combined ledger the page shows:
+# the per-source cache, delta syncs, on-disk snapshots and the background
+# pollers that keep them fresh. One per process; the page keeps it in
+# st.cache_resource, benchmarks and the CLI build their own.
+class LedgerService:
+    def __init__(self, sources, snapshot_dir, ttl=60, max_entries=32, max_bytes=64 << 20,
+                 window_rows=None, fetch_workers=None, poll_min=10, poll_idle=600, probe=None):
+        ledger.configure(window_rows=window_rows, fetch_workers=fetch_workers, probe=probe)
+        self.sources      = list(sources)
+        self.snapshot_dir = snapshot_dir
+        self.ttl          = ttl
+        self.poll_min     = poll_min
+        self.poll_idle    = poll_idle
+        self.cache        = LRUCache(max_entries=max_entries, max_bytes=max_bytes,
+                                     name="ledger_cache")
+        self._refresher   = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ledger-refresh")
+        self._pollers     = {}      # (user, spreadsheet_id) -> Poller
+        self._lock        = threading.Lock()
+
+    def key(self, user, src):
+        return (user, src.spreadsheet_id, src.sheet, ledger.TOTALS_RANGE, ledger.LEDGER_RANGE)
+
+    def load_snapshot(self, src, user=None):
+        snap = snapshot.load(self.snapshot_dir, src.spreadsheet_id, src.sheet)
+        if snap is None or (user is not None and snap[1]["owner"] != user):
+            return None
+        return snap[0]
+
+    # Stale-while-revalidate: whatever the cache holds is served straight away,
+    # and the user's pollers keep it at most ttl old. An entry older than that
+    # (the poller had stopped, or its polls failed) is served too while a poll
+    # is kicked; so are on-disk snapshots after a restart. The returned future
+    # (or None) resolves to the refreshed ledger. Only a source with neither a
+    # cached copy nor a snapshot is fetched before returning.
+    def fetch(self, access_token):
+        user = auth.identity(access_token)   # verifies the token on every call
+        pollers = self.pollers(user, access_token)
+        states, old, missing = {}, set(), []
+        for src in self.sources:
+            hit = self.cache.get_aged(self.key(user, src))
+            if hit is None:
+                missing.append(src)
+            else:
+                states[src] = hit[0]
+                if hit[1] > self.ttl: old.add(src.spreadsheet_id)
+        if missing:
+            snaps = {src: self.load_snapshot(src, user) for src in missing}
+            if all(snap is not None for snap in snaps.values()):
+                for src, snap in snaps.items():
+                    self.cache.put(self.key(user, src), snap)
+                states.update(snaps)
+                old.update(src.spreadsheet_id for src in snaps)
+            else:
+                states.update(self.refresh(user, access_token, snaps))
+
+        pending = None
+        if old:
+            metrics.incr("ledger_cache.stale_served")
+            kicks = [pollers[sid].kick() for sid in old]
+            pending = self._refresher.submit(self._settled, user, kicks, states)
+        return self.combine(user, [states[src] for src in self.sources]), pending
+
+    def _settled(self, user, kicks, states):
+        for fut in kicks:
+            fut.result()
+        current = []
+        for src in self.sources:
+            hit = self.cache.peek(self.key(user, src))
+            current.append(hit[0] if hit else states[src])
+        return self.combine(user, current)
+
+    def refresh(self, user, access_token, bases):
+        synced = ledger.sync_sources(access_token, list(bases.items()))
+        out = {}
+        for (src, base), state in zip(bases.items(), synced):
+            self.cache.put(self.key(user, src), state)
+            if state is not base:
+                try:
+                    snapshot.save(self.snapshot_dir, src.spreadsheet_id, src.sheet, state,
+                                  owner=user)
+                except OSError:
+                    metrics.incr("snapshot.save_errors")
+            out[src] = state
+        return out
+
+    # The user's pollers by spreadsheet, started on first use and handed the
+    # newest access token.
+    def pollers(self, user, access_token):
+        out = {}
+        with self._lock:
+            for src in self.sources:
+                sid = src.spreadsheet_id
+                p = self._pollers.get((user, sid))
+                if p is None or not p.alive:
+                    p = Poller(self, user, [s for s in self.sources if s.spreadsheet_id == sid],
+                               access_token, self.poll_min, self.ttl, self.poll_idle)
+                    self._pollers[(user, sid)] = p
+                p.touch(access_token)
+                out[sid] = p
+            metrics.gauge("poller.active", len(self._pollers))
+        return out
+
+    # Called by a poller before each poll; False retires it.
+    def _keep(self, poller):
+        with self._lock:
+            if poller.alive and time.time() - poller.seen <= poller.idle:
+                return True
+            poller.alive = False
+            k = (poller.user, poller.sources[0].spreadsheet_id)
+            if self._pollers.get(k) is poller:
+                del self._pollers[k]
+            metrics.gauge("poller.active", len(self._pollers))
+            return False
+
+    # Snapshots only: no sign-in, no network.
+    def offline(self):
+        snaps = [self.load_snapshot(src) for src in self.sources]
+        if None in snaps:
+            raise RuntimeError(f"no snapshot for every source in {self.snapshot_dir!r}")
+        return self.combine(None, snaps)
+
+    def combine(self, user, states):
+        return ledger.combine(states, [src.label for src in self.sources], scope=user)
+
+    # Sync Ledger: poll the user's spreadsheets now and wait for the result;
+    # their pollers go back to the fast interval.
+    def sync(self, access_token):
+        user = auth.identity(access_token)
+        for fut in [p.kick(fast=True) for p in self.pollers(user, access_token).values()]:
+            fut.result()
+
+    # Sign out: stop the user's pollers and drop their ledgers from memory.
+    def forget(self, user):
+        self._stop(lambda k: k[0] == user)
+        self.cache.discard(lambda k: k[0] == user)
+
+    def close(self):
+        self._stop(lambda k: True)
+        self._refresher.shutdown(wait=False)
+
+    def _stop(self, pred):
+        with self._lock:
+            for k in [k for k in self._pollers if pred(k)]:
+                self._pollers.pop(k).stop()
+            metrics.gauge("poller.active", len(self._pollers))
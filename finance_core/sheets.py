@@ -0,0 +1,57 @@
+import os
+from collections import namedtuple
+
+from . import auth, metrics, transport
+from .singleflight import Group
+
+# Overridable so benchmarks and load tests can point at bench/standin.py.
+SHEETS_API = os.environ.get("SHEETS_API_URL", "https://sheets.googleapis.com/v4/spreadsheets")
+
+# One tab of one spreadsheet; label is what the combined ledger's source column shows.
+Source = namedtuple("Source", "spreadsheet_id sheet label")
+
+# Sessions that miss the cache together share one upstream request per sheet/range.
+# Requests are keyed on who is asking (the verified identity behind the token),
+# not on the token itself: each session holds its own access token, and two of
+# them reading the same sheet for the same user should still send one request.
+# Different users never share, so no one reads a sheet through someone else.
+_flights = Group("sheets.flight")
+
+
+def a1(sheet, cells):
+    # Always quote the tab name so spaces / punctuation in SHEET_NAME are safe.
+    return "'" + sheet.replace("'", "''") + "'!" + cells
+
+# One values:batchGet round trip for every range; grids come back in request order.
+def batch_get(spreadsheet_id, ranges, access_token, **params):
+    ranges = tuple(ranges)
+    key = (spreadsheet_id, ranges, tuple(sorted(params.items())), auth.identity(access_token))
+    return _flights.do(key, lambda: _batch_get(spreadsheet_id, ranges, access_token, params))
+
+def _batch_get(spreadsheet_id, ranges, access_token, params):
+    query = [("ranges", r) for r in ranges] + list(params.items())
+    with metrics.timer("sheets.batch_get"):
+        resp = transport.get(
+            f"{SHEETS_API}/{spreadsheet_id}/values:batchGet",
+            params=query, headers={"Authorization": f"Bearer {access_token}"})
+    metrics.incr("sheets.round_trips")
+    resp.raise_for_status()
+    grids = [vr.get("values", []) for vr in resp.json().get("valueRanges", [])]
+    return grids + [[] for _ in range(len(ranges) - len(grids))]
+
+# Grid size of every tab (rows, used or not): the upper bound for windowed reads.
+def grid_sizes(spreadsheet_id, access_token):
+    resp = transport.get(
+        f"{SHEETS_API}/{spreadsheet_id}",
+        params={"fields": "sheets.properties(title,gridProperties.rowCount)"},
+        headers={"Authorization": f"Bearer {access_token}"})
+    metrics.incr("sheets.round_trips")
+    resp.raise_for_status()
+    return {props.get("title"): int(props.get("gridProperties", {}).get("rowCount", 0))
+            for props in (sh.get("properties", {}) for sh in resp.json().get("sheets", []))}
+
+def grid_rows(spreadsheet_id, sheet, access_token):
+    sizes = grid_sizes(spreadsheet_id, access_token)
+    if sheet not in sizes:
+        raise KeyError(f"no tab named {sheet!r} in spreadsheet")
+    return sizes[sheet]
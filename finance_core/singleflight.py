@@ -0,0 +1,50 @@
+import threading
+
+from . import metrics
+
+
+# ── Single-flight ─────────────────────────────────────────────────────────────
+# Concurrent callers with the same key share one in-flight call: the first one
+# runs fn, the rest block until it finishes and get the same result (or error).
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done   = threading.Event()
+        self.result = None
+        self.error  = None
+
+
+class Group:
+    def __init__(self, name="singleflight"):
+        self.name   = name
+        self._lock  = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            metrics.incr(f"{self.name}.shared")
+            call.done.wait()
+            if call.error is not None: raise call.error
+            return call.result
+
+        metrics.incr(f"{self.name}.leaders")
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,90 @@
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+import numpy as np
+import pandas as pd
+
+from . import metrics
+from .ledger import LedgerState
+
+# ── On-disk ledger snapshots ──────────────────────────────────────────────────
+# One snapshot per spreadsheet/tab: the parsed ledger as Parquet, the row
+# fingerprints (so a delta sync can resume from it) and a small JSON manifest.
+# The manifest is written last and is what makes a snapshot visible; it records
+# the row count and a CRC of the other two files, so a load that finds them out
+# of step with it (a crash or another process mid-save) is rejected. Saves and
+# loads of one snapshot are serialized within the process.
+FORMAT = 4          # 4: earlier full syncs could stop at a blank row between windows
+
+_locks    = {}      # stem -> Lock
+_locks_mu = threading.Lock()
+
+
+def _stem(directory, spreadsheet_id, sheet):
+    return os.path.join(directory, re.sub(r"[^A-Za-z0-9_.-]+", "_", f"{spreadsheet_id}__{sheet}"))
+
+def _lock(stem):
+    with _locks_mu:
+        return _locks.setdefault(stem, threading.Lock())
+
+# Writes to a unique temp file next to path, then renames it over path.
+def _replace(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
+
+def save(directory, spreadsheet_id, sheet, state, owner):
+    os.makedirs(directory, exist_ok=True)
+    stem = _stem(directory, spreadsheet_id, sheet)
+    buf = io.BytesIO()
+    state.frame.to_parquet(buf, index=False)
+    parquet, fps = buf.getvalue(), state.fingerprints.tobytes()
+    manifest = {"format": FORMAT, "owner": owner, "totals": list(state.totals), "rows_crc": state.rows_crc,
+                "version": state.version, "rows": len(state.frame),
+                "parquet_crc": zlib.crc32(parquet), "fp_crc": zlib.crc32(fps), "saved_at": time.time()}
+    with _lock(stem):
+        _replace(stem + ".parquet", parquet)
+        _replace(stem + ".fp", fps)
+        _replace(stem + ".json", json.dumps(manifest).encode())
+    metrics.incr("snapshot.saves")
+
+# Returns (state, manifest), or None when there is no usable snapshot.
+def load(directory, spreadsheet_id, sheet):
+    stem = _stem(directory, spreadsheet_id, sheet)
+    try:
+        with _lock(stem):
+            with open(stem + ".json") as fh:
+                manifest = json.load(fh)
+            if manifest.get("format") != FORMAT:
+                return None
+            with open(stem + ".parquet", "rb") as fh:
+                parquet = fh.read()
+            with open(stem + ".fp", "rb") as fh:
+                fps = fh.read()
+        if zlib.crc32(parquet) != manifest["parquet_crc"] or zlib.crc32(fps) != manifest["fp_crc"]:
+            raise ValueError("snapshot files do not match their manifest")
+        frame = pd.read_parquet(io.BytesIO(parquet))
+        if len(frame) != manifest["rows"]:
+            raise ValueError("snapshot row count does not match its manifest")
+        fps = np.frombuffer(fps, dtype=np.uint64).copy()
+    except (OSError, ValueError, KeyError) as e:
+        if not isinstance(e, FileNotFoundError):
+            metrics.incr("snapshot.load_errors")
+        return None
+    state = LedgerState(frame, tuple(manifest["totals"]), fps, manifest["rows_crc"])
+    if state.version != manifest["version"]:
+        metrics.incr("snapshot.load_errors")
+        return None
+    metrics.incr("snapshot.loads")
+    return state, manifest
@@ -0,0 +1,105 @@
+import email.utils
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import metrics
+
+# ── Settings ──────────────────────────────────────────────────────────────────
+POOL_CONNECTIONS  = 4       # hosts kept pooled (sheets, oauth2, …)
+POOL_MAXSIZE      = 16      # keep-alive connections per host
+CONNECT_TIMEOUT   = 3.05
+READ_TIMEOUT      = 20
+MAX_RETRIES       = 4
+BACKOFF_BASE      = 0.5     # seconds; doubled each attempt, full jitter
+BACKOFF_CAP       = 8
+RETRY_AFTER_LIMIT = 30      # never park a script thread longer than this
+RETRY_STATUSES    = frozenset({429, 500, 502, 503, 504})
+
+_lock    = threading.Lock()
+_session = None
+
+
+def session():
+    global _session
+    with _lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS,
+                                  pool_maxsize=POOL_MAXSIZE, max_retries=0)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _session = s
+        return _session
+
+
+# ── Pool accounting ───────────────────────────────────────────────────────────
+# urllib3 counts requests and newly opened connections per pool; every request
+# that did not need a new connection reused a pooled keep-alive socket.
+def pool_stats():
+    hits = misses = 0
+    s = _session
+    if s is not None:
+        for adapter in {id(a): a for a in s.adapters.values()}.values():
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                try: pool = pools[key]
+                except KeyError: continue
+                misses += pool.num_connections
+                hits   += max(0, pool.num_requests - pool.num_connections)
+    return {"hits": hits, "misses": misses}
+
+def _record_pool():
+    stats = pool_stats()
+    metrics.gauge("http.pool.hits", stats["hits"])
+    metrics.gauge("http.pool.misses", stats["misses"])
+
+
+# ── Requests with backoff ─────────────────────────────────────────────────────
+def _backoff(attempt):
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+def _retry_after(resp):
+    v = resp.headers.get("Retry-After")
+    if not v: return None
+    try: return max(0.0, float(v))
+    except ValueError: pass
+    try: return max(0.0, email.utils.parsedate_to_datetime(v).timestamp() - time.time())
+    except (TypeError, ValueError): return None
+
+def request(method, url, retries=None, **kw):
+    kw.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+    retries = MAX_RETRIES if retries is None else retries
+    attempt = 0
+    while True:
+        metrics.incr("http.requests")
+        try:
+            resp = session().request(method, url, **kw)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= retries:
+                metrics.incr("http.failures")
+                raise
+            delay = _backoff(attempt)
+        else:
+            _record_pool()
+            metrics.incr("http.bytes_in", len(resp.content))
+            if resp.status_code not in RETRY_STATUSES or attempt >= retries:
+                return resp
+            if resp.status_code == 429: metrics.incr("http.throttled")
+            delay = _retry_after(resp)
+            if delay is None:
+                delay = _backoff(attempt)
+            elif delay > RETRY_AFTER_LIMIT:
+                return resp
+        metrics.incr("http.retries")
+        attempt += 1
+        time.sleep(delay)
+
+def get(url, **kw):
+    return request("GET", url, **kw)
+
+def post(url, **kw):
+    return request("POST", url, **kw)
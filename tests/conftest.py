@@ -0,0 +1,11 @@
+import pytest
+
+from bench.standin import StandIn
+
+
+# A local Sheets API with 500 ledger rows, finance_core pointed at it.
+@pytest.fixture
+def standin():
+    with StandIn(rows=500) as si:
+        si.point_core()
+        yield si
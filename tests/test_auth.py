@@ -0,0 +1,32 @@
+import pytest
+
+from finance_core import auth
+
+
+@pytest.fixture(autouse=True)
+def fresh_memo(monkeypatch):
+    monkeypatch.setattr(auth, "_identities", {})
+
+def tokeninfo_calls(standin):
+    return standin.stats()["requests"].get("oauth.tokeninfo", 0)
+
+def test_identity_is_remembered_within_the_ttl(standin):
+    token = standin.issue("alice")
+    assert auth.identity(token) == auth.identity(token) == "alice"
+    assert tokeninfo_calls(standin) == 1
+
+# A token Google has revoked keeps working from the memo for IDENTITY_TTL at
+# most, however long it was issued for.
+def test_a_revoked_token_is_rejected_once_the_ttl_passes(standin, monkeypatch):
+    token = standin.issue("alice")
+    assert auth.identity(token) == "alice"
+    del standin.tokens[token]
+    assert auth.identity(token) == "alice"
+    monkeypatch.setattr(auth.time, "time", lambda t=auth.time.time(): t + auth.IDENTITY_TTL + 1)
+    with pytest.raises(auth.AuthError):
+        auth.identity(token)
+
+def test_a_failed_code_exchange_is_not_retried(standin, monkeypatch):
+    monkeypatch.setattr(standin, "error_rate", 1.0)
+    auth.exchange_code("code", "client", "secret", "http://localhost/")
+    assert standin.stats()["requests"]["oauth.token"] == 1
@@ -0,0 +1,25 @@
+import csv
+
+from finance_core import export, ledger, sheets
+
+
+class Tokens:
+    def call(self, fn):
+        return fn("user:alice")
+
+def test_a_blank_row_at_a_window_boundary_does_not_end_the_export(standin, tmp_path, monkeypatch):
+    monkeypatch.setattr(ledger, "WINDOW_ROWS", 100)
+    standin.add_sheet(standin.spreadsheet_id, "Gaps", rows=249)
+    for c in standin.books[standin.spreadsheet_id]["Gaps"].columns:
+        c[99] = ""
+    src = sheets.Source(standin.spreadsheet_id, "Gaps", "Gaps")
+    out = str(tmp_path / "ledger.csv")
+    summary, state = export.export(Tokens(), [src], "csv", out)
+    with open(out, newline="") as fh:
+        rows = list(csv.DictReader(fh))
+    assert summary["rows"] == len(rows) == 248
+    assert int(rows[-1]["row"]) == ledger.FIRST_ROW + 248
+
+    standin.append([["Coffee", -4.5, "", ""]], sheet="Gaps")
+    summary, _ = export.export(Tokens(), [src], "csv", out, state)
+    assert summary["mode"] == "incremental" and summary["rows"] == 1
@@ -0,0 +1,43 @@
+from finance_core import ledger, metrics
+
+TOKEN = "user:alice"
+
+
+def sync(standin, state=None):
+    return ledger.sync(standin.spreadsheet_id, standin.sheet, TOKEN, state)
+
+def test_appended_rows_are_a_delta(standin):
+    state = sync(standin)
+    standin.append([["Coffee", -4.5, "", ""], ["Refund", "", 12.25, ""]])
+    metrics.reset()
+    after = sync(standin, state)
+    assert metrics.get("ledger.delta_syncs") == 1 and metrics.get("ledger.edits_detected") == 0
+    assert len(after.frame) == len(state.frame) + 2
+    assert after.totals == tuple(standin.books[standin.spreadsheet_id][standin.sheet].totals())
+
+# An edit the tail and sample checks cannot see still moves the totals by
+# something other than the appended rows.
+def test_an_edit_alongside_an_append_reloads_in_full(standin, monkeypatch):
+    monkeypatch.setattr(ledger, "SAMPLES", 0)
+    state = sync(standin)
+    columns = standin.books[standin.spreadsheet_id][standin.sheet].columns
+    columns[1][0], columns[2][0], columns[3][0] = 1000.0, "", ""
+    standin.append([["Coffee", -4.5, "", ""]])
+    metrics.reset()
+    after = sync(standin, state)
+    assert metrics.get("ledger.edits_detected") == 1
+    assert after.version == sync(standin).version
+
+# The API trims a window's trailing blank rows, so a window that ends on a
+# blank row comes back short even though the ledger goes on after it.
+def test_a_blank_row_at_a_window_boundary_does_not_end_the_ledger(standin, monkeypatch):
+    monkeypatch.setattr(ledger, "WINDOW_ROWS", 100)
+    standin.add_sheet(standin.spreadsheet_id, "Gaps", rows=249)
+    columns = standin.books[standin.spreadsheet_id]["Gaps"].columns
+    for c in columns:
+        c[99] = ""
+    state = ledger.sync(standin.spreadsheet_id, "Gaps", TOKEN)
+    assert len(state.frame) == 248 and state.row_count == 249
+    standin.append([["Coffee", -4.5, "", ""]], sheet="Gaps")
+    after = ledger.sync(standin.spreadsheet_id, "Gaps", TOKEN, state)
+    assert len(after.frame) == 249
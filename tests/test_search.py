@@ -0,0 +1,24 @@
+import pytest
+
+from finance_core import ledger
+
+NAMES = ["Coffee shop", "Grocery run", "Amazon order", "Rent", "Tea"]
+
+
+@pytest.fixture
+def model():
+    columns = [NAMES, [-4.5, -82.1, -19.99, -1200.0, -3.0], [], []]
+    state = ledger.EMPTY.extend(ledger.raw_frame(columns), (0.0, 0.0, 0.0))
+    return ledger.Combined([state], ["test"]).model()
+
+def names(model, query):
+    return sorted(model.names_at(model.search("spending", query)))
+
+@pytest.mark.parametrize("query", ["ff", "e", "on", "zon", "offee", "p", "n o"])
+def test_terms_match_anywhere_in_the_name(model, query):
+    terms = query.split()
+    assert names(model, query) == sorted(n for n in NAMES if all(t in n.lower() for t in terms))
+
+def test_amount_filters(model):
+    assert names(model, "<-50") == ["Grocery run", "Rent"]
+    assert names(model, "e >-5") == ["Coffee shop", "Tea"]
@@ -0,0 +1,41 @@
+from finance_core import ledger, sheets
+from finance_core.service import LedgerService
+
+TOKEN = "user:alice"
+
+
+def service(standin, snapshot_dir):
+    src = sheets.Source(standin.spreadsheet_id, standin.sheet, "Ledger")
+    return LedgerService([src], str(snapshot_dir), ttl=60, poll_min=60)
+
+def test_cold_start_fetches_before_returning(standin, tmp_path):
+    svc = service(standin, tmp_path)
+    try:
+        combined, pending = svc.fetch(TOKEN)
+    finally:
+        svc.close()
+    assert pending is None
+    assert isinstance(combined, ledger.Combined)
+    assert len(combined.frame) == 500
+
+# After a restart the snapshot is served at once; the poll it kicks resolves
+# to the combined ledger with the rows appended since the snapshot was taken.
+def test_warm_start_pending_resolves_to_the_refreshed_ledger(standin, tmp_path):
+    svc = service(standin, tmp_path)
+    try:
+        before, _ = svc.fetch(TOKEN)
+    finally:
+        svc.close()
+    standin.append([["Coffee", -4.5, "", ""]] * 3)
+
+    svc = service(standin, tmp_path)
+    try:
+        state, pending = svc.fetch(TOKEN)
+        assert state.version == before.version
+        assert pending is not None
+        after = pending.result(timeout=10)
+    finally:
+        svc.close()
+    assert isinstance(after, ledger.Combined)
+    assert after.version != state.version
+    assert len(after.frame) == 503
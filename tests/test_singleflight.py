@@ -0,0 +1,110 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from finance_core import metrics, sheets
+from finance_core.singleflight import Group
+
+N = 16
+
+
+# Fires n callers at once (all behind one barrier) and returns what each got:
+# ("ok", result) or ("error", exception).
+def fire(n, call):
+    barrier = threading.Barrier(n)
+    def one(i):
+        barrier.wait()
+        try:
+            return "ok", call(i)
+        except Exception as e:
+            return "error", e
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        return list(pool.map(one, range(n)))
+
+# An upstream stand-in that blocks until released, so every caller arrives
+# while the first call is still in flight.
+class Stub:
+    def __init__(self, result=None, error=None):
+        self.calls   = 0
+        self.release = threading.Event()
+        self.result  = result
+        self.error   = error
+
+    def __call__(self, *args, **kw):
+        self.calls += 1
+        self.release.wait(5)
+        if self.error is not None: raise self.error
+        return self.result
+
+# Lets the stub return once the other n - 1 callers are waiting on the leader.
+def release_when_waiting(group, stub, n):
+    shared = f"{group.name}.shared"
+    base = metrics.get(shared)
+    def watch():
+        while metrics.get(shared) - base < n - 1:
+            time.sleep(0.001)
+        stub.release.set()
+    threading.Thread(target=watch, daemon=True).start()
+
+
+def test_concurrent_callers_share_one_call():
+    group, stub = Group("test.ok"), Stub(result={"rows": 3})
+    release_when_waiting(group, stub, N)
+    results = fire(N, lambda i: group.do("key", stub))
+    assert stub.calls == 1
+    assert all(kind == "ok" for kind, _ in results)
+    assert all(r is stub.result for _, r in results)
+    assert group.in_flight() == 0
+
+def test_concurrent_callers_share_the_error():
+    boom = RuntimeError("upstream failed")
+    group, stub = Group("test.error"), Stub(error=boom)
+    release_when_waiting(group, stub, N)
+    results = fire(N, lambda i: group.do("key", stub))
+    assert stub.calls == 1
+    assert all(kind == "error" and e is boom for kind, e in results)
+    # The failed call is not remembered: the next caller runs again.
+    stub.error, stub.result = None, "fresh"
+    stub.release.set()
+    assert group.do("key", stub) == "fresh" and stub.calls == 2
+
+def test_different_keys_do_not_share():
+    group, stub = Group("test.keys"), Stub(result="x")
+    stub.release.set()
+    fire(4, lambda i: group.do(i, stub))
+    assert stub.calls == 4
+
+
+class Response:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+@pytest.fixture
+def upstream(monkeypatch):
+    body = {"valueRanges": [{"values": [["Coffee"], [-4.5]]}]}
+    stub = Stub(result=Response(body))
+    monkeypatch.setattr(sheets.transport, "get", stub)
+    # Every session holds its own token; tok-a* belong to one user.
+    monkeypatch.setattr(sheets.auth, "identity", lambda token: token.split("-")[1][0])
+    monkeypatch.setattr(sheets, "_flights", Group("test.sheets"))
+    return stub
+
+def test_batch_get_shares_one_request_across_a_users_sessions(upstream):
+    release_when_waiting(sheets._flights, upstream, N)
+    results = fire(N, lambda i: sheets.batch_get("sid", ["'L'!A3:D"], f"tok-a{i}"))
+    assert upstream.calls == 1
+    assert all(kind == "ok" and r == [[["Coffee"], [-4.5]]] for kind, r in results)
+
+def test_batch_get_never_shares_between_users(upstream):
+    upstream.release.set()
+    sheets.batch_get("sid", ["'L'!A3:D"], "tok-a1")
+    sheets.batch_get("sid", ["'L'!A3:D"], "tok-b1")
+    assert upstream.calls == 2
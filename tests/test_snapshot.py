@@ -0,0 +1,46 @@
+import os
+import threading
+
+import pytest
+
+from finance_core import ledger, snapshot
+
+
+@pytest.fixture
+def state(standin):
+    return ledger.full_sync(standin.spreadsheet_id, standin.sheet, "user:alice")
+
+def test_round_trip(state, tmp_path):
+    snapshot.save(str(tmp_path), "sid", "Ledger", state, owner="alice")
+    loaded, manifest = snapshot.load(str(tmp_path), "sid", "Ledger")
+    assert loaded.version == state.version
+    assert manifest["owner"] == "alice" and manifest["rows"] == len(state.frame)
+    assert len(os.listdir(tmp_path)) == 3
+
+@pytest.mark.parametrize("ext", [".parquet", ".fp"])
+def test_files_out_of_step_with_the_manifest_are_rejected(state, tmp_path, ext):
+    snapshot.save(str(tmp_path), "sid", "Ledger", state, owner="alice")
+    path = snapshot._stem(str(tmp_path), "sid", "Ledger") + ext
+    with open(path, "r+b") as fh:
+        fh.seek(-1, os.SEEK_END)
+        last = fh.read(1)
+        fh.seek(-1, os.SEEK_END)
+        fh.write(bytes([last[0] ^ 0xFF]))
+    assert snapshot.load(str(tmp_path), "sid", "Ledger") is None
+
+def test_concurrent_saves_leave_one_whole_snapshot(state, tmp_path):
+    barrier = threading.Barrier(8)
+    errors = []
+    def save(i):
+        barrier.wait()
+        try:
+            snapshot.save(str(tmp_path), "sid", "Ledger", state, owner=f"u{i}")
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=save, args=(i,)) for i in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert errors == []
+    loaded, manifest = snapshot.load(str(tmp_path), "sid", "Ledger")
+    assert loaded.version == state.version
+    assert sorted(os.listdir(tmp_path)) == ["sid__Ledger.fp", "sid__Ledger.json", "sid__Ledger.parquet"]